@@ -0,0 +1,55 @@
+"""Statistical summaries of the runs of an experiment across several seeds, reported under _extras.benchmark."""
+import statistics
+
+
+def isSolved(result):
+    return result["sol"] is not None
+
+
+def summarizeRuns(runs, timeout):
+    """Summary of the runs of an experiment, given as {seed: result}.
+
+    The raw times, objectives and phase timings of every seed are kept. The median and the
+    interquartile range of the time count the unsolved runs as the timeout, while the PAR-2 score
+    (the mean time with the unsolved runs penalized to twice the timeout) ranks models that fail
+    on some seeds behind the ones that always succeed.
+    """
+    seeds = sorted(runs)
+    times = [runs[seed]["time"] if isSolved(runs[seed]) else timeout for seed in seeds]
+    if len(seeds) > 1:
+        q1, median, q3 = statistics.quantiles(times, n=4, method="inclusive")
+    else:
+        q1 = median = q3 = times[0]
+
+    return {
+        "seeds": seeds,
+        "times": [runs[seed]["time"] for seed in seeds],
+        "objs": [runs[seed]["obj"] for seed in seeds],
+        "timings": [runs[seed].get("_extras", {}).get("timings", {}) for seed in seeds],
+        "success_rate": sum([isSolved(runs[seed]) for seed in seeds]) / len(seeds),
+        "optimal_rate": sum([isSolved(runs[seed]) and bool(runs[seed]["optimal"]) for seed in seeds]) / len(seeds),
+        "median_time": median,
+        "iqr_time": q3 - q1,
+        "par2": statistics.mean([
+            time if isSolved(runs[seed]) else 2 * timeout
+            for seed, time in zip(seeds, times)
+        ])
+    }
+
+
+def aggregateRuns(runs, timeout):
+    """Result of an experiment run with several seeds, given as {seed: result}.
+
+    A single run is returned as is. Otherwise the run with the median time (counting the unsolved
+    runs as the timeout) represents the experiment, with the summary of all the runs in
+    _extras.benchmark. With an even number of runs this is the lower of the two middle runs, so
+    time is the time of an actual run (consistent with its solution) while _extras.benchmark.median_time
+    is the average of the two middle times.
+    """
+    if len(runs) == 1:
+        return next(iter(runs.values()))
+
+    ranked = sorted(runs, key=lambda seed: (not isSolved(runs[seed]), runs[seed]["time"]))
+    result = {**runs[ranked[(len(ranked) - 1) // 2]]}
+    result["_extras"] = {**result.get("_extras", {}), "benchmark": summarizeRuns(runs, timeout)}
+    return result
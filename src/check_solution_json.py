@@ -2,6 +2,7 @@ import os
 import re
 import sys
 import json
+import numpy as np
 from itertools import combinations
 
 
@@ -93,7 +94,8 @@ def fatal_errors(solution):
     teams = get_teams(solution)
     n = max(teams)
 
-    if any([t not in set(teams) for t in range(1,n+1)]):
+    team_set = set(teams)
+    if any([t not in team_set for t in range(1,n+1)]):
         fatal_errors.append(f'Missing team in the solution or team out of range!!!')
 
     if n%2 != 0:
@@ -109,7 +111,54 @@ def fatal_errors(solution):
     return fatal_errors
 
 
-def check_solution(solution: list):
+def get_solution_array(solution):
+    """Returns the solution as an int array of shape (periods, weeks, 2), or None if it does not have that shape."""
+    try:
+        solution_array = np.array(solution)
+    except ValueError:
+        # Ragged nested lists
+        return None
+    if (solution_array.ndim != 3) or (solution_array.shape[2] != 2) or (solution_array.dtype.kind not in "iu"):
+        return None
+    return solution_array.astype(np.int64)
+
+
+def fatal_errors_array(solution_array):
+    fatal_errors = []
+
+    if solution_array.size == 0:
+        fatal_errors.append('The solution cannot be empty')
+        return fatal_errors
+
+    teams = solution_array.ravel()
+    n = int(teams.max())
+
+    team_counts = np.bincount(teams[teams >= 1], minlength=n+1)
+    if np.any(team_counts[1:] == 0):
+        fatal_errors.append(f'Missing team in the solution or team out of range!!!')
+
+    if n%2 != 0:
+        fatal_errors.append(f'"n" should be even!!!')
+
+    if solution_array.shape[0] != n//2:
+        fatal_errors.append(f'the number of periods is not compliant!!!')
+
+    if solution_array.shape[1] != n - 1:
+        fatal_errors.append(f'the number of weeks is not compliant!!!')
+
+    return fatal_errors
+
+
+def _has_repeated_keys(groups, values, max_repetitions):
+    """Checks if any value appears more than max_repetitions times within the same group."""
+    values_range = int(values.max()) - int(values.min()) + 1
+    keys = groups.astype(np.int64) * values_range + (values - values.min())
+    _, counts = np.unique(keys, return_counts=True)
+    return bool(np.any(counts > max_repetitions))
+
+
+def check_solution_lists(solution: list):
+    """List-based checks, used for solutions that cannot be represented as a (periods, weeks, 2) array."""
 
     errors = fatal_errors(solution)
 
@@ -145,6 +194,40 @@ def check_solution(solution: list):
     
     return (True, None) if len(errors) == 0 else (False, errors)
 
+def check_solution(solution: list):
+    solution_array = get_solution_array(solution)
+    if solution_array is None:
+        # Malformed solutions are reported by the list-based checks
+        return check_solution_lists(solution)
+
+    errors = fatal_errors_array(solution_array)
+
+    if len(errors) == 0:
+        periods, weeks, _ = solution_array.shape
+        home, away = solution_array[:, :, 0].ravel(), solution_array[:, :, 1].ravel()
+
+        # every team plays with every other teams only once
+        not_self = home != away
+        low, high = np.minimum(home, away)[not_self], np.maximum(home, away)[not_self]
+        if (len(low) > 0) and _has_repeated_keys(low, high, 1):
+            errors.append('There are duplicated matches!!!')
+
+        # each team cannot play against itself
+        if np.any(~not_self):
+            errors.append('There are self-playing teams')
+
+        # every team plays once a week
+        week_index = np.broadcast_to(np.arange(weeks)[None, :, None], solution_array.shape)
+        if _has_repeated_keys(week_index.ravel(), solution_array.ravel(), 1):
+            errors.append('Some teams play multiple times in a week')
+
+        # every team plays at most twice during the period
+        period_index = np.broadcast_to(np.arange(periods)[:, None, None], solution_array.shape)
+        if _has_repeated_keys(period_index.ravel(), solution_array.ravel(), 2):
+            errors.append('Some teams play more than twice in the period')
+    
+    return (True, None) if len(errors) == 0 else (False, errors)
+
 def isSuboptimal(result):
     return (not result["optimal"]) and (result["sol"] is not None)
 
@@ -218,17 +301,24 @@ def main(args):
                     instances_status[subfolder][inst_number_int][solver] = {
                         "status": SUBOPTIMAL_STR,
                         "time": result["time"],
-                        "obj": result["obj"]
+                        "obj": result["obj"],
+                        "timings": result.get("_extras", {}).get("timings", {})
                     }
                 elif isOptimal(result):
                     instances_status[subfolder][inst_number_int][solver] = {
                         "status": OPTIMAL_STR,
                         "time": result["time"],
-                        "obj": result["obj"]
+                        "obj": result["obj"],
+                        "timings": result.get("_extras", {}).get("timings", {})
                     }
                 else:
                     raise Exception("Case not handled")
 
+                # Statistics of the runs across seeds (benchmark mode)
+                benchmark = result.get("_extras", {}).get("benchmark")
+                if benchmark is not None:
+                    instances_status[subfolder][inst_number_int][solver]["benchmark"] = benchmark
+
     print(json.dumps(instances_status, indent=4))
 
 
@@ -0,0 +1,221 @@
+"""Constructive (search-free) generator of STS schedules.
+
+A schedule is a balanced tournament design: every week is a perfect matching of the teams, every
+pair of teams meets once and every team plays at most twice in a period. A direct construction
+covers each residue class of n (for n = 4 no schedule exists). In every construction the
+parity rule of the other models assigns home and away teams, so every team has imbalance 1.
+
+n = 0, 2 mod 6 (circle method). The matches are the ones of the circle method used by the CP, SMT
+and MILP round-robin models: with m = n - 1, team 1 is the center of the circle and the other teams
+are the elements of Z_m (team x + 2 is the element x). In week c, team 1 plays team c + 2 (match
+class 0) and, for every i in 1..n/2-1, the teams c + i and c - i play against each other (match class i).
+Assigning to each match its class as period, every team but team 1 plays once in period 0 and
+exactly twice in every other period. Team 1 is then moved away from period 0: in every week c != 0,
+the class 0 match is swapped with the class i(c) = min(2c mod m, -2c mod m) match. The weeks c and -c
+move team 1 in the same period, and the teams moved into period 0 in week c are c + i(c), whose own
+class 0 match is in period i(c), and c - i(c) = 3c (mod m). As long as 3 does not divide m, the
+map c -> 3c is a bijection, so no team ends up more than twice in a period.
+
+n = 10 mod 12. k = n/2 is coprime with 6 and the teams are the pairs (x, s) of Z_k x {0, 1}, with
+the periods indexed by Z_k. In the center week x, (x, 0) plays (x, 1) in period x and, for every
+i in 1..(k-1)/2, (x - i, s) plays (x + i, s) in period x + l*i if s = 0 and x - l*i if s = 1,
+with l = 3 or its inverse modulo k.
+In the mixed week d != 0, (y, 0) plays (y + d, 1) in period y + t(d) for every y.
+Every team then plays in the center weeks with the offsets (period minus own x) 0 and +-(l +- 1)*i,
+and t is chosen so that, with the mixed weeks, every non-zero offset is taken exactly twice.
+
+n = 4 mod 12. r = n/2 - 1 is 1 mod 6 and the teams are the pairs (x, s) of Z_r x {0, 1} and two
+teams inf_0 and inf_1, with the periods indexed by Z_r and an extra period R. A base week B is
+developed cyclically: for every x in Z_r, B + x (x added to every team and period, with R and
+the infinite teams fixed) and B + x with the sides swapped are weeks, and the last week has
+(x, 0) against (x, 1) in period x and inf_0 against inf_1 in period R. Every pair of teams
+meets once because the differences of B cover every pure (same side) difference once and half of the
+mixed ones, and a team plays at most twice in a period because in B the offsets of the teams
+(period minus own x) take every value at most twice, and 0 at most once.
+"""
+
+
+def _parity_orientation(a, b):
+    """Returns the match (home, away) of teams a and b assigned with the parity rule."""
+    a, b = min(a, b), max(a, b)
+    return (a, b) if (a + b) % 2 == 0 else (b, a)
+
+
+def circle_matches(n):
+    """Returns the matches of the circle method as matches[c][i] = (home, away), with 1-based teams.
+
+    c is the week and i the class of the match, which is the same indexing of the rr_home/rr_away arrays
+    of the CP and MILP round-robin models.
+    """
+    m = n - 1
+    matches = []
+    for c in range(m):
+        week_matches = []
+        for i in range(n // 2):
+            if i == 0:
+                a, b = 1, c + 2
+            else:
+                a, b = (c + i) % m + 2, (c - i) % m + 2
+            week_matches.append(_parity_orientation(a, b))
+        matches.append(week_matches)
+    return matches
+
+
+def _match_class(d, m):
+    d = d % m
+    return min(d, m - d)
+
+
+def closed_form_periods(n):
+    """Returns periods[c][i], the period (0-based) of the match of class i in week c.
+
+    The assignment is valid if (n - 1) is not a multiple of 3.
+    """
+    m = n - 1
+    periods = []
+    for c in range(m):
+        week_periods = list(range(n // 2))
+        if c != 0:
+            i = _match_class(2 * c, m)
+            week_periods[0], week_periods[i] = week_periods[i], week_periods[0]
+        periods.append(week_periods)
+    return periods
+
+
+def _circle_weeks(n):
+    """Returns weeks[c][p] = (team, team), the schedule of the circle method for n = 0, 2 mod 6."""
+    matches = circle_matches(n)
+    periods = closed_form_periods(n)
+    weeks = [[None for p in range(n // 2)] for c in range(n - 1)]
+    for c in range(n - 1):
+        for i in range(n // 2):
+            weeks[c][periods[c][i]] = matches[c][i]
+    return weeks
+
+
+def _mixed_shifts(k):
+    """Returns (l, t) with t[d] the period shift of the mixed week d of the Z_k x {0, 1} construction.
+
+    The mixed week d gives the offset t(d) to the side 0 teams and t(d) - d to the side 1 teams.
+    Writing them as -(l - 1)*p and (l - 1)*w, the center weeks leave the same values of p and w to
+    both sides, which the pairs below split so that p + w, and so d = -(l - 1)*(p + w), takes
+    every non-zero value once.
+    """
+    h = (k - 1) // 2
+    pairs = []
+    if h % 2 == 0:
+        l, g = 3, h // 2
+        pairs += [(x, 2 * (g - x)) for x in range(0, g)]
+        pairs += [(x, 2 * (3 * g + 1 - x)) for x in range(g + 1, 2 * g + 1)]
+        pairs += [(2 * a, h - a) for a in range(1, h + 1)]
+    else:
+        l, g = pow(3, -1, k), (h - 1) // 2
+        pairs += [(x, 2 * (g - x) + 1) for x in range(0, g + 1)]
+        pairs += [(x, 2 * (3 * g + 2 - x) + 1) for x in range(g + 2, 2 * g + 2)]
+        pairs += [(2 * a - 1, h - a + 1) for a in range(1, h + 1)]
+
+    t = {}
+    for p, w in pairs:
+        t[(-(l - 1) * (p + w)) % k] = (-(l - 1) * p) % k
+    return l, t
+
+
+def _odd_weeks(k):
+    """Returns weeks[w][p] = (team, team), the Z_k x {0, 1} schedule of n = 2k teams, with k coprime with 6."""
+    h = (k - 1) // 2
+    l, t = _mixed_shifts(k)
+    # Team (x, s) is x + s*k + 1
+    team = lambda x, s: x % k + s * k + 1
+
+    weeks = []
+    for x in range(k):
+        week = [None for p in range(k)]
+        week[x] = (team(x, 0), team(x, 1))
+        for i in range(1, h + 1):
+            week[(x + l * i) % k] = (team(x - i, 0), team(x + i, 0))
+            week[(x - l * i) % k] = (team(x - i, 1), team(x + i, 1))
+        weeks.append(week)
+    for d in range(1, k):
+        week = [None for p in range(k)]
+        for y in range(k):
+            week[(y + t[d]) % k] = (team(y, 0), team(y + d, 1))
+        weeks.append(week)
+    return weeks
+
+
+def _base_week(r):
+    """Returns the base week of the Z_r x {0, 1} + {inf_0, inf_1} construction, with r = 1 mod 6.
+
+    The base week is a list of (period, team, team), with the period r standing for R, the teams
+    (x, s) and the infinite teams ("inf", s). With h = (r - 1)/2 and z the sequence 0, h, 1, h - 1, ...
+    of the integers 0..h, whose consecutive elements differ by h, h - 1, ..., 1:
+        - (-1)^j z[j] and (-1)^j z[j+1] play in period j + 1, one on each side: the low integers
+          (<= h/2) on side h mod 2 and the high ones on the other side. This covers every mixed
+          difference class once and all the teams but (0, high side) and (-1)^h z[h], which play
+          the infinite teams in periods 0 and h + 1.
+        - the remaining teams play the pure matches -i, i: on the high side in period -2i if i is low,
+          on the low side in period 2i if i is high, and in period R for the class z[h].
+    """
+    h = (r - 1) // 2
+    z = [j // 2 if j % 2 == 0 else h - j // 2 for j in range(h + 1)]
+    low_side = h % 2
+    side = lambda v: low_side if v <= h // 2 else 1 - low_side
+
+    week = []
+    for j in range(h):
+        sign = 1 if j % 2 == 0 else -1
+        week.append((j + 1, ((sign * z[j]) % r, side(z[j])), ((sign * z[j + 1]) % r, side(z[j + 1]))))
+    for i in range(1, h + 1):
+        if i == z[h]:
+            period = r
+        else:
+            period = (2 * i) % r if i > h // 2 else (-2 * i) % r
+        week.append((period, (i, 1 - side(i)), (r - i, 1 - side(i))))
+    week.append((0, ("inf", 0), (0, 1 - low_side)))
+    week.append((h + 1, ("inf", 1), (((-1) ** h * z[h]) % r, side(z[h]))))
+    return week
+
+
+def _cyclic_weeks(r):
+    """Returns weeks[w][p] = (team, team), the schedule of n = 2r + 2 teams developed from the base week."""
+    # Team (x, s) is x + s*r + 1, the infinite teams are 2r + 1 and 2r + 2
+    team = lambda x, s: 2 * r + s + 1 if x == "inf" else x % r + s * r + 1
+    translate = lambda p, x: p if p == r else (p + x) % r
+    move = lambda v, s, x, swap: (v, s) if v == "inf" else (v + x, s ^ swap)
+    base_week = _base_week(r)
+
+    weeks = []
+    for swap in [0, 1]:
+        for x in range(r):
+            week = [None for p in range(r + 1)]
+            for p, a, b in base_week:
+                week[translate(p, x)] = (team(*move(*a, x, swap)), team(*move(*b, x, swap)))
+            weeks.append(week)
+    week = [(team(x, 0), team(x, 1)) for x in range(r)]
+    week.append((team("inf", 0), team("inf", 1)))
+    weeks.append(week)
+    return weeks
+
+
+def balanced_tournament(n):
+    """Returns weeks[w][p] = (team, team), a schedule of n teams (1-based) without home/away, or None if none exists."""
+    if (n < 2) or (n % 2 != 0) or (n == 4):
+        return None
+    if (n - 1) % 3 != 0:
+        return _circle_weeks(n)
+    if (n // 2) % 2 == 1:
+        return _odd_weeks(n // 2)
+    return _cyclic_weeks(n // 2 - 1)
+
+
+def round_robin_schedule(n):
+    """Returns a schedule in the output format (sol[period][week] = [home, away]), or None."""
+    weeks = balanced_tournament(n)
+    if weeks is None:
+        return None
+
+    sol = [[None for w in range(n - 1)] for p in range(n // 2)]
+    for w, week in enumerate(weeks):
+        for p, (a, b) in enumerate(week):
+            sol[p][w] = list(_parity_orientation(a, b))
+    return sol
@@ -0,0 +1,49 @@
+from .round_robin import round_robin_schedule
+from timings import PhaseTimer, SOLVE
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+experiments = [
+    {
+        "name": "round_robin_construct",
+        "constructor": round_robin_schedule,
+    },
+]
+
+def list_models():
+    return [experiment["name"] for experiment in experiments]
+
+def solve(instance, timeout, cache={}, random_seed=42, models_filter=None, **kwargs):
+    results = {}
+
+    for experiment in experiments:
+        if (models_filter is not None) and (experiment["name"] not in models_filter):
+            continue
+        logger.info(f"Starting model {experiment['name']}")
+        name = experiment["name"]
+
+        # Check if result is in cache
+        if name in cache:
+            logger.info(f"Cache hit")
+            results[name] = cache[name]
+            continue
+
+        start_time = time.time()
+        timer = PhaseTimer(SOLVE)
+        # The constructions are deterministic, so the seed is not used
+        sol = experiment["constructor"](instance)
+        timer.end()
+        exec_time = time.time() - start_time
+
+        # The parity rule for home/away always gives max imbalance 1
+        results[name] = {
+            "time": exec_time if sol is not None else timeout,
+            "optimal": sol is not None,
+            "obj": 1 if sol is not None else None,
+            "sol": sol,
+            "_extras": {"timings": timer.timings}
+        }
+
+    return results
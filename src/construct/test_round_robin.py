@@ -0,0 +1,22 @@
+"""Checks the constructed schedules. Run from src with: python -m pytest construct"""
+import pytest
+from construct.round_robin import round_robin_schedule
+from check_solution_json import check_solution
+
+
+@pytest.mark.parametrize("n", range(6, 101, 2))
+def test_round_robin_schedule(n):
+    sol = round_robin_schedule(n)
+    assert sol is not None
+    assert check_solution(sol) == (True, None)
+
+    imbalance = {team: 0 for team in range(1, n + 1)}
+    for period in sol:
+        for home, away in period:
+            imbalance[home] += 1
+            imbalance[away] -= 1
+    assert max(abs(value) for value in imbalance.values()) == 1
+
+
+def test_round_robin_schedule_without_solution():
+    assert round_robin_schedule(4) is None
@@ -1,48 +1,176 @@
-from subprocess import Popen, PIPE
+from subprocess import Popen, PIPE, TimeoutExpired, run
 import os
 import json
+import hashlib
+import tempfile
+import functools
 import logging
 logger = logging.getLogger(__name__)
 import time
 from pathlib import Path
 
+# Content-addressed cache of the compiled FlatZinc (.fzn) and output (.ozn) files
+FZN_CACHE_DIR = os.path.join(Path(__file__).parent.resolve(), ".fzn_cache")
 
-def __formatCommand(model_path, data_path, solver, timeout_ms, seed, free_search):
+
+@functools.lru_cache(maxsize=None)
+def __minizincVersion():
+    return run(["minizinc", "--version"], capture_output=True).stdout.decode("utf-8").strip()
+
+
+def __compiledModelKey(model_path, data, solver):
+    """Hash of the inputs of the compilation: model, data, solver and MiniZinc version."""
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        digest.update(f.read())
+    digest.update(f"\0{data}\0{solver}\0{__minizincVersion()}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def __parseCompilerStatistics(stdout):
+    """Parses the '%%%mzn-stat: key=value' lines printed by the compiler."""
+    statistics = {}
+    for line in stdout.splitlines():
+        if not line.startswith("%%%mzn-stat:"): continue
+        key, _, value = line[len("%%%mzn-stat:"):].strip().partition("=")
+        try:
+            statistics[key] = json.loads(value)
+        except json.JSONDecodeError:
+            statistics[key] = value
+    return statistics
+
+
+def __compileModel(model_path, data, solver, timeout_ms):
+    """Compiles a model to FlatZinc for a solver, reusing the cached compilation if available.
+
+    Returns the paths of the .fzn and .ozn files (None if the compilation failed) and the compilation info.
+    """
+    os.makedirs(FZN_CACHE_DIR, exist_ok=True)
+    key = __compiledModelKey(model_path, data, solver)
+    fzn_path = os.path.join(FZN_CACHE_DIR, f"{key}.fzn")
+    ozn_path = os.path.join(FZN_CACHE_DIR, f"{key}.ozn")
+    stats_path = os.path.join(FZN_CACHE_DIR, f"{key}.json")
+    compile_info = {
+        "cache_hit": False,
+        "compile_time": 0.0,
+        "statistics": None,
+        "crash_reason": None
+    }
+
+    # The .fzn file is written last, so its presence means that the entry is complete
+    if os.path.isfile(fzn_path):
+        compile_info["cache_hit"] = True
+        if os.path.isfile(stats_path):
+            with open(stats_path, "r") as f:
+                compile_info["statistics"] = json.load(f)
+        return fzn_path, ozn_path, compile_info
+
+    # Compile in temporary files, then atomically move them in the cache
+    fd, tmp_fzn_path = tempfile.mkstemp(suffix=".fzn", dir=FZN_CACHE_DIR)
+    os.close(fd)
+    fd, tmp_ozn_path = tempfile.mkstemp(suffix=".ozn", dir=FZN_CACHE_DIR)
+    os.close(fd)
+    compile_cmd = [
+        "minizinc",
+        "--compile",
+        "--compiler-statistics",
+        "--output-mode", "json",
+        "--output-objective",
+        "--solver", f"{solver}",
+        "--model", f"{os.path.abspath(model_path)}",
+        "--cmdline-data", f"{data}",
+        "--fzn", tmp_fzn_path,
+        "--ozn", tmp_ozn_path,
+    ]
+    start_time = time.monotonic()
+    try:
+        with Popen(compile_cmd, stdout=PIPE, stderr=PIPE) as pipe:
+            try:
+                stdout, stderr = pipe.communicate(timeout=timeout_ms/1000)
+            except TimeoutExpired:
+                # Compilation took the whole time budget, reported as a timeout
+                pipe.kill()
+                pipe.communicate()
+                compile_info["compile_time"] = time.monotonic() - start_time
+                return None, None, compile_info
+        compile_info["compile_time"] = time.monotonic() - start_time
+
+        if pipe.returncode in [-6, -11]:
+            compile_info["crash_reason"] = "out-of-memory"
+            return None, None, compile_info
+        elif pipe.returncode != 0:
+            compile_info["crash_reason"] = f"minizinc_error: {stderr.decode('utf-8').strip()}"
+            return None, None, compile_info
+
+        compile_info["statistics"] = __parseCompilerStatistics(stdout.decode("utf-8"))
+        with open(stats_path, "w") as f:
+            json.dump(compile_info["statistics"], f)
+        os.replace(tmp_ozn_path, ozn_path)
+        os.replace(tmp_fzn_path, fzn_path)
+    finally:
+        for path in [tmp_fzn_path, tmp_ozn_path]:
+            if os.path.isfile(path): os.remove(path)
+
+    return fzn_path, ozn_path, compile_info
+
+
+def __formatCommand(fzn_path, ozn_path, solver, timeout_ms, seed, free_search):
     cmd = [
         "minizinc",
         "--json-stream",
-        "--output-mode", "json",
         # "--all",
         "--statistics",
         "--solver", f"{solver}",
         "--time-limit", f"{timeout_ms}",
         "--random-seed", f"{seed}",
         "--output-time",
-        "--output-objective",
-        "--model", f"{os.path.abspath(model_path)}",
-        "--data", f"{os.path.abspath(data_path)}",
+        f"{fzn_path}",
+        "--ozn-file", f"{ozn_path}",
     ]
     if free_search:
         cmd.append("-f")
     return cmd
 
 
-def minizincSolve(model_path: str, data_path: str, solver: str, timeout_ms: int, seed: int, free_search: bool=False):
+def minizincSolve(model_path: str, data: str, solver: str, timeout_ms: int, seed: int, free_search: bool=False, solution_callback=None):
     """
         Calls MiniZinc on a model and returns solving statistics and all solutions.
+
+        The instance data is given in-memory in dzn syntax (e.g. "n = 10;"), so that multiple
+        experiments can run concurrently.
+
+        If given, solution_callback is called with each intermediate solution as soon as it is
+        streamed by MiniZinc. If it returns True, the search is cancelled and the solutions found
+        so far are returned (outcome["cancelled"] is set).
+
+        The model is compiled to FlatZinc once per (model, data, solver, MiniZinc version) and cached,
+        the solver is then run on the FlatZinc with the remaining time.
     """
     solutions = []
     outcome = {
         "mz_status": None,
         "time_ms": None,
-        "crash_reason": None
+        "crash_reason": None,
+        "cancelled": False
     }
     statistics = {
         "compiler": None,
         "solver": None,
-        "solution": None
+        "solution": None,
+        "compile_time": None,
+        "compile_cache_hit": None
     }
-    minizinc_cmd = __formatCommand(model_path, data_path, solver, timeout_ms, seed, free_search)
+
+    fzn_path, ozn_path, compile_info = __compileModel(model_path, data, solver, timeout_ms)
+    statistics["compiler"] = compile_info["statistics"]
+    statistics["compile_time"] = compile_info["compile_time"]
+    statistics["compile_cache_hit"] = compile_info["cache_hit"]
+    if fzn_path is None:
+        outcome["crash_reason"] = compile_info["crash_reason"]
+        return outcome, solutions, statistics
+
+    remaining_timeout_ms = max(int(timeout_ms - compile_info["compile_time"]*1000), 1)
+    minizinc_cmd = __formatCommand(fzn_path, ozn_path, solver, remaining_timeout_ms, seed, free_search)
 
     with Popen(minizinc_cmd, stdout=PIPE, stderr=PIPE) as pipe:
         while True:
@@ -51,19 +179,18 @@ def minizincSolve(model_path: str, data_path: str, solver: str, timeout_ms: int,
             data = json.loads(out_stream)
 
             if data["type"] == "statistics":
+                # The compiler statistics come from the compilation step
                 if solver in ["gecode", "chuffed"]:
-                    # Gecode/Chuffed outputs 3 statistics at different times.
-                    if statistics["compiler"] is None: 
-                        statistics["compiler"] = data["statistics"]
-                    elif statistics["solver"] is None: 
+                    # Gecode/Chuffed outputs the solver statistics at different times.
+                    if statistics["solver"] is None: 
                         statistics["solver"] = data["statistics"]
                     elif statistics["solution"] is None: 
                         statistics["solution"] = data["statistics"]
                     else: 
                         logger.warning("Unexpected statistics from Gecode/Chuffed")
                 elif "ortools" in solver:
-                    if statistics["compiler"] is None: 
-                        statistics["compiler"] = data["statistics"]
+                    if statistics["solver"] is None: 
+                        statistics["solver"] = data["statistics"]
                     else:
                         pass # OR-tools sends statistics for each intermediate solution
                 else:
@@ -90,13 +217,21 @@ def minizincSolve(model_path: str, data_path: str, solver: str, timeout_ms: int,
                 }
                 solutions.append(sol)
 
+                if (solution_callback is not None) and solution_callback(sol):
+                    # MiniZinc terminates the solver process on SIGTERM
+                    outcome["cancelled"] = True
+                    pipe.terminate()
+                    break
+
             elif data["type"] == "status":
                 outcome["mz_status"] = data["status"]
                 outcome["time_ms"] = data["time"]
 
         pipe.wait()
         stderr_output = pipe.stderr.read().decode("utf-8")
-        if pipe.returncode in [-6, -11]:
+        if outcome["cancelled"]:
+            pass
+        elif pipe.returncode in [-6, -11]:
             outcome["crash_reason"] = "out-of-memory"
         elif pipe.returncode != 0:
             outcome["crash_reason"] = f"minizinc_error: {stderr_output.strip()}"
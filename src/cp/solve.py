@@ -1,4 +1,5 @@
 from .minizinc_utils import minizincSolve
+from timings import PhaseTimer, BUILD, COMPILE, SOLVE, EXTRACTION
 import pathlib
 import os
 import math
@@ -8,6 +9,11 @@ logger = logging.getLogger(__name__)
 
 
 
+def _solutionObjective(variables):
+    if "_objective" in variables:
+        return variables["_objective"]
+    return variables.get("max_imbalance")
+
 def _solutionExtractorFromForwardPath(variables):
     solution = variables["matches"]
     return solution
@@ -111,7 +117,8 @@ experiments_chuffed_naive = [
         "solver": "chuffed",
         "solution_extractor_fn": _solutionExtractorFromForwardPath,
         "preprocessing": [],
-        "free_search": False
+        "free_search": False,
+        "target_objective": 1
     },
     {
         "name": "naive_CP_impl_chuffed",
@@ -119,7 +126,8 @@ experiments_chuffed_naive = [
         "solver": "chuffed",
         "solution_extractor_fn": _solutionExtractorFromForwardPath,
         "preprocessing": [],
-        "free_search": False
+        "free_search": False,
+        "target_objective": 1
     },
     {
         "name": "naive_CP_symm_chuffed",
@@ -127,7 +135,8 @@ experiments_chuffed_naive = [
         "solver": "chuffed",
         "solution_extractor_fn": _solutionExtractorFromForwardPath,
         "preprocessing": [],
-        "free_search": False
+        "free_search": False,
+        "target_objective": 1
     },
     {
         "name": "naive_CP_full_chuffed",
@@ -135,7 +144,8 @@ experiments_chuffed_naive = [
         "solver": "chuffed",
         "solution_extractor_fn": _solutionExtractorFromForwardPath,
         "preprocessing": [],
-        "free_search": False
+        "free_search": False,
+        "target_objective": 1
     },
 ]
 
@@ -146,7 +156,8 @@ experiments_gecode_naive = [
         "solver": "gecode",
         "solution_extractor_fn": _solutionExtractorFromForwardPath,
         "preprocessing": [],
-        "free_search": False
+        "free_search": False,
+        "target_objective": 1
     },
     {
         "name": "naive_CP_impl_gecode",
@@ -154,7 +165,8 @@ experiments_gecode_naive = [
         "solver": "gecode",
         "solution_extractor_fn": _solutionExtractorFromForwardPath,
         "preprocessing": [],
-        "free_search": False
+        "free_search": False,
+        "target_objective": 1
     },
     {
         "name": "naive_CP_symm_gecode",
@@ -162,7 +174,8 @@ experiments_gecode_naive = [
         "solver": "gecode",
         "solution_extractor_fn": _solutionExtractorFromForwardPath,
         "preprocessing": [],
-        "free_search": False
+        "free_search": False,
+        "target_objective": 1
     },
     {
         "name": "naive_CP_full_gecode",
@@ -170,15 +183,41 @@ experiments_gecode_naive = [
         "solver": "gecode",
         "solution_extractor_fn": _solutionExtractorFromForwardPath,
         "preprocessing": [],
-        "free_search": False
+        "free_search": False,
+        "target_objective": 1
+    },
+]
+
+
+# Two-phase models of cp/gecode/ that minimize max_imbalance with Gecode
+experiments_gecode_split = [
+    {
+        "name": "split_CP_plain_gecode",
+        "model_path": os.path.join(pathlib.Path(__file__).parent.resolve(), "./gecode/plain_split_optimization.mzn"),
+        "solver": "gecode",
+        "solution_extractor_fn": _solutionExtractorFromForwardPath,
+        "preprocessing": [],
+        "free_search": False,
+        "target_objective": 1
+    },
+    {
+        "name": "split_CP_symm_gecode",
+        "model_path": os.path.join(pathlib.Path(__file__).parent.resolve(), "./gecode/plain_symm_split_optimization.mzn"),
+        "solver": "gecode",
+        "solution_extractor_fn": _solutionExtractorFromForwardPath,
+        "preprocessing": [],
+        "free_search": False,
+        "target_objective": 1
     },
 ]
 
 
-experiments_setup = experiments_chuffed_rr + experiments_gecode_rr + experiments_chuffed_naive + experiments_gecode_naive
+experiments_setup = experiments_chuffed_rr + experiments_gecode_rr + experiments_chuffed_naive + experiments_gecode_naive + experiments_gecode_split
+
+def list_models():
+    return [experiment["name"] for experiment in experiments_setup]
 
 def solve(instance, timeout, cache={}, random_seed=42, models_filter=None, **kwargs):
-    instance_path = os.path.join(pathlib.Path(__file__).parent.resolve(), ".instance.dzn")
     out_results = {}
 
     for experiment in experiments_setup:
@@ -192,28 +231,40 @@ def solve(instance, timeout, cache={}, random_seed=42, models_filter=None, **kwa
             out_results[experiment["name"]] = cache[experiment["name"]]
             continue
 
-        dzn_content = f"n = {instance};\n"
         start_time = time.time()
+        timer = PhaseTimer(BUILD)
 
-        # Create instance input file
-        with open(instance_path, "w") as f:
-            f.write(dzn_content)
+        # Instance data, passed in-memory to MiniZinc
+        dzn_content = f"n = {instance};"
         preprocess_time = time.time() - start_time
         
-        # Solve instance
+        # Track the intermediate solutions and stop as soon as the target objective is reached
+        objective_trajectory = []
+        def onSolution(solution):
+            objective = _solutionObjective(solution["variables"])
+            objective_trajectory.append([solution["time_ms"]/1000, objective])
+            target_objective = experiment.get("target_objective")
+            return (target_objective is not None) and (objective is not None) and (objective <= target_objective)
+
+        # Solve instance, the compilation is timed by minizincSolve
+        timer.begin(SOLVE)
         outcome, solutions, statistics = minizincSolve(
             model_path = experiment["model_path"],
-            data_path = instance_path,
+            data = dzn_content,
             solver = experiment["solver"],
             timeout_ms = math.floor(timeout - preprocess_time)*1000,
             seed = random_seed,
-            free_search = experiment["free_search"]
+            free_search = experiment["free_search"],
+            solution_callback = onSolution
         )
         solve_time = time.time() - start_time
+        timer.end()
+        # Move the compilation out of the solve phase
+        timer.add(SOLVE, -statistics["compile_time"])
+        timer.add(COMPILE, statistics["compile_time"])
 
-        print(outcome, solutions, statistics, "\n"*5)
-
-
+        if outcome["cancelled"]:
+            logger.info(f"Target objective reached, search stopped after {solve_time:.2f} s")
 
         if (outcome["mz_status"] is None) and (len(solutions) > 0):
             # Solver crashed before finishing but there are intermediate solutions.
@@ -231,12 +282,11 @@ def solve(instance, timeout, cache={}, random_seed=42, models_filter=None, **kwa
             crash_reason = outcome["crash_reason"]
         else:
             overall_time = math.floor(solve_time)
-            if "_objective" in solutions[-1]["variables"]:
-                objective = solutions[-1]["variables"]["_objective"]
-            else:
-                objective = solutions[-1]["variables"]["max_imbalance"]
+            objective = _solutionObjective(solutions[-1]["variables"])
             optimality = objective == 1
+            timer.begin(EXTRACTION)
             solution = experiment["solution_extractor_fn"](solutions[-1]["variables"])
+            timer.end()
             crash_reason = outcome["crash_reason"]
 
         out_results[experiment["name"]] = {
@@ -247,9 +297,16 @@ def solve(instance, timeout, cache={}, random_seed=42, models_filter=None, **kwa
             "_extras": {
                 "statistics": statistics,
                 "crash_reason": crash_reason,
-                "time_to_last_solution": None if len(solutions) == 0 else (preprocess_time + solutions[-1]["time_ms"]/1000)
+                "time_to_first_solution": None if len(solutions) == 0 else (preprocess_time + statistics["compile_time"] + solutions[0]["time_ms"]/1000),
+                "time_to_last_solution": None if len(solutions) == 0 else (preprocess_time + statistics["compile_time"] + solutions[-1]["time_ms"]/1000),
+                # [time in seconds, objective] of each intermediate solution
+                "objective_trajectory": [
+                    [preprocess_time + statistics["compile_time"] + solution_time, objective]
+                    for solution_time, objective in objective_trajectory
+                ],
+                "cancelled": outcome["cancelled"],
+                "timings": timer.end()
             }
         }
-        os.remove(instance_path)
 
     return out_results
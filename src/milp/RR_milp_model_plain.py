@@ -1,6 +1,7 @@
 import pulp
 import json
 import time
+from timings import PhaseTimer, BUILD, SOLVE, EXTRACTION
 
 def create_milp_model(n,solver, timeout=60):
     """
@@ -9,6 +10,7 @@ def create_milp_model(n,solver, timeout=60):
     timeout: time limit in seconds
     Returns: dict with results for different solvers
     """
+    timer = PhaseTimer(BUILD)
     
     # Parameters
     weeks = n - 1
@@ -141,14 +143,17 @@ def create_milp_model(n,solver, timeout=60):
     
     for solver_name, solver in solvers.items():
         start_time = time.time()
+        timer.begin(SOLVE)
         
         # Solve with current solver
         prob.solve(solver)
         
         solve_time = time.time() - start_time
+        timer.end()
         
         if prob.status == pulp.LpStatusOptimal:
             # Extract solution
+            timer.begin(EXTRACTION)
             solution_period_slot = {}
             for w in range(1, weeks + 1):
                 for p in range(1, periods + 1):
@@ -197,7 +202,7 @@ def create_milp_model(n,solver, timeout=60):
                 "optimal": True,
                 "obj": max_imbalance,
                 "sol": sol,
-                "_extras": {"runner": ""}
+                "_extras": {"runner": "", "timings": timer.end()}
             }
             
         else:
@@ -206,7 +211,7 @@ def create_milp_model(n,solver, timeout=60):
                 "optimal": False,
                 "obj": None,
                 "sol": None,
-                "_extras": {"runner": ""}
+                "_extras": {"runner": "", "timings": timer.end()}
             }
     
     return results
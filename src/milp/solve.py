@@ -9,6 +9,7 @@ import pathlib
 import warnings
 import math
 import time
+from timings import PhaseTimer, BUILD, SOLVE, EXTRACTION
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +26,7 @@ def run_ampl_model(model_file, n_teams, solver, timeout, random_seed):
     #add_to_path(r'c:/Users/cmaio/AppData/Roaming/Microsoft/Windows/Start Menu/Programs/AMPL IDE.lnk') #Damodificareperreproducibilità
     # ampl = AMPL()
     ampl = None
+    timer = PhaseTimer(BUILD)
 
     try:
         ampl.read(model_file)
@@ -40,9 +42,11 @@ def run_ampl_model(model_file, n_teams, solver, timeout, random_seed):
         ampl.setOption('randseed', random_seed)
 
         start_time = time.time()
+        timer.begin(SOLVE)
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
             ampl.solve()
+        timer.end()
         
         solve_time = math.floor(time.time() - start_time)
         objective = round( ampl.getObjective('max_imbalance').value() )
@@ -52,6 +56,7 @@ def run_ampl_model(model_file, n_teams, solver, timeout, random_seed):
     
         
         # Extraction of solution for sports scheduling
+        timer.begin(EXTRACTION)
         matches = ampl.getVariable('matches')
         n = ampl.getValue('n')
         
@@ -68,7 +73,8 @@ def run_ampl_model(model_file, n_teams, solver, timeout, random_seed):
             "time": solve_time if is_optimal else timeout,
             "optimal": is_optimal,
             "obj": objective,
-            "sol": solution
+            "sol": solution,
+            "_extras": {"timings": timer.end()}
         }
     except Exception as e:
         logger.error(f"Error with solver {solver} and model {model_file}: {str(e)}")
@@ -76,7 +82,8 @@ def run_ampl_model(model_file, n_teams, solver, timeout, random_seed):
             "time": timeout,
             "optimal": False,
             "obj": None,
-            "sol": None
+            "sol": None,
+            "_extras": {"timings": timer.end()}
         }
     finally:
         if ampl is not None:
@@ -98,6 +105,9 @@ models_setup = [
     
 ]
 
+def list_models():
+    return [model['name'] + '_' + solver for model in models_setup for solver in SOLVERS]
+
 def solve(instance, timeout=300, cache={}, random_seed=42, models_filter=None, **kwargs):
     # Extract number of teams from instance (should be an integer)
     n = instance  # instance is just the number of teams
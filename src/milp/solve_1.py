@@ -35,7 +35,8 @@ def run_milp_model(model_file, solver, number_of_teams, timeout, random_seed):
                 "time": round(result["time"], 4) if result["optimal"] else round(timeout, 4),
                 "optimal": result["optimal"],
                 "obj": result["obj"],
-                "sol": result["sol"]
+                "sol": result["sol"],
+                "_extras": {"timings": result["_extras"]["timings"]}
             }
         else:
             raise Exception(f"Solver {solver} not found in results")
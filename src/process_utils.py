@@ -0,0 +1,166 @@
+"""Helpers to run solvers in isolated child processes."""
+import os
+import signal
+import multiprocessing
+import platform
+import threading
+import time
+import logging
+logger = logging.getLogger(__name__)
+
+#check if the platform is not Windows
+if platform.system() != "Windows":
+    import resource
+
+
+def setMemoryLimit(mem_limit):
+    """Limits the address space of the current process to mem_limit MB (no limit if negative)."""
+    if mem_limit >= 0 and platform.system() != "Windows":
+        resource.setrlimit(resource.RLIMIT_AS, (mem_limit*1024*1024, mem_limit*1024*1024))
+
+
+def _killGroupOnParentExit(parent_pid, poll_interval=1):
+    """Kills the process group of the calling process as soon as its parent exits."""
+    while os.getppid() == parent_pid:
+        time.sleep(poll_interval)
+    os.killpg(0, signal.SIGKILL)
+
+
+def isolateProcess(mem_limit=-1):
+    """To be called at the start of a child process.
+
+    Moves the process in its own process group, so that it can be killed together with the
+    external solvers it spawns (e.g. MiniZinc), and applies the memory limit.
+    As the group is no longer reached by the signals sent to the group of the parent, the group is
+    also killed when the parent exits (e.g. a race member killed while running an isolated solver).
+    """
+    if platform.system() != "Windows":
+        parent_pid = os.getppid()
+        os.setsid()
+        threading.Thread(target=_killGroupOnParentExit, args=(parent_pid,), daemon=True).start()
+    setMemoryLimit(mem_limit)
+
+
+def killProcessTree(process):
+    """Kills a multiprocessing.Process started with isolateProcess and all of its descendants."""
+    if not process.is_alive(): return
+    try:
+        if platform.system() != "Windows":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+    process.join()
+
+
+def _classifyError(error):
+    """Crash reason of an exception raised by a solver."""
+    message = str(error)
+    if isinstance(error, MemoryError) or any(text in message.lower() for text in ["out of memory", "bad_alloc", "max. memory"]):
+        return "out-of-memory"
+    return f"python_error: {message}"
+
+
+def oomKillCount():
+    """Number of processes killed by the OOM killer in the cgroup of the current process, None if unknown."""
+    try:
+        with open("/sys/fs/cgroup/memory.events", "r") as f:
+            for line in f:
+                key, value = line.split()
+                if key == "oom_kill":
+                    return int(value)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def exitCrashReason(exitcode, mem_limit=-1, oom_kills=None):
+    """Crash reason of a child process that died without reporting, given its exit code.
+
+    oom_kills is the value of oomKillCount() before the child was started.
+    """
+    # Killed by a signal: SIGABRT/SIGSEGV on failed allocations under the memory limit, SIGKILL
+    # from the OOM killer. Without any evidence of memory exhaustion, a SIGKILL came from outside.
+    out_of_memory = (mem_limit >= 0) or ((oom_kills is not None) and (oomKillCount() != oom_kills))
+    if exitcode in [-6, -9, -11] and out_of_memory:
+        return "out-of-memory"
+    elif exitcode == -9:
+        return "killed"
+    return f"exit_code: {exitcode}"
+
+
+def _isolatedTarget(fn, args, mem_limit, connection):
+    """Entry point of the child process of runIsolated."""
+    isolateProcess(mem_limit)
+    try:
+        connection.send((fn(*args), None))
+    except BaseException as e:
+        connection.send((None, _classifyError(e)))
+    connection.close()
+
+
+def runIsolated(fn, args=(), timeout=None, mem_limit=-1):
+    """Runs fn(*args) in a child process with a memory limit and a hard wall-clock limit in seconds.
+
+    The child runs in its own process group (see isolateProcess), which is killed as a whole at the
+    wall-clock limit. Returns an outcome dictionary with the return value of fn (None if it did not return),
+    the crash reason (None if it returned or was killed at the wall-clock limit) and whether it was killed.
+    """
+    oom_kills = oomKillCount()
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_isolatedTarget, args=(fn, args, mem_limit, sender))
+    process.start()
+    sender.close()
+
+    outcome = {
+        "result": None,
+        "crash_reason": None,
+        "killed": False
+    }
+    try:
+        if receiver.poll(timeout):
+            outcome["result"], outcome["crash_reason"] = receiver.recv()
+        else:
+            outcome["killed"] = True
+    except EOFError:
+        # The child died without reporting
+        pass
+    finally:
+        if outcome["killed"]:
+            killProcessTree(process)
+        process.join()
+        receiver.close()
+
+    if (outcome["result"] is None) and (outcome["crash_reason"] is None) and (not outcome["killed"]):
+        outcome["crash_reason"] = exitCrashReason(process.exitcode, mem_limit, oom_kills)
+    return outcome
+
+
+def solveIsolated(fn, args, timeout, mem_limit=-1, grace_time=10):
+    """Runs a solving function returning a results dictionary through runIsolated.
+
+    The wall-clock limit is timeout plus grace_time seconds and also covers the model building.
+    If the child does not return, the results report no solution within the timeout.
+    _extras.crash_reason is always set.
+    """
+    outcome = runIsolated(fn, args, timeout + grace_time, mem_limit)
+    if outcome["result"] is None:
+        if outcome["crash_reason"] is not None:
+            logger.warning(f"Solver crashed. Reason: {outcome['crash_reason']}")
+        else:
+            logger.warning(f"Solver killed after {timeout + grace_time} s")
+        return {
+            "time": timeout,
+            "optimal": False,
+            "obj": None,
+            "sol": None,
+            "_extras": {
+                "crash_reason": outcome["crash_reason"],
+                "killed": outcome["killed"]
+            }
+        }
+
+    results = outcome["result"]
+    results.setdefault("_extras", {}).setdefault("crash_reason", None)
+    return results
@@ -0,0 +1,190 @@
+from cp.solve import solve as cp_solve
+from sat.solve import solve as sat_solve
+from smt.solve import solve as smt_solve
+from milp.solve_1 import solve as milp_solve
+from construct.solve import solve as construct_solve
+from process_utils import isolateProcess, killProcessTree, exitCrashReason, oomKillCount
+import multiprocessing
+import queue
+import argparse
+import os
+import json
+import time
+import logging
+logger = logging.getLogger(__name__)
+
+# The round-robin MILP models (e.g. RR_milp_SB_HiGHS) are served by milp.solve_1
+RACE_METHODS = {
+    "cp": cp_solve,
+    "sat": sat_solve,
+    "smt": smt_solve,
+    "milp": milp_solve,
+    "construct": construct_solve,
+}
+
+# Interval in seconds between the checks for members that died without reporting a result
+DEATH_POLL_INTERVAL = 1
+
+DEFAULT_PORTFOLIO = [
+    "cp:RR_CP_symm_chuffed",
+    "smt:round_robin_bitvec_symm",
+    "sat:solver_z3_z3",
+    "milp:RR_milp_SB_HiGHS",
+]
+
+
+def _parseMember(member):
+    method, model = member.split(":", 1)
+    if method not in RACE_METHODS:
+        raise ValueError(f"Unknown method {method} in portfolio member {member}")
+    return method, model
+
+
+def _runMember(member, instance, timeout, random_seed, mem_limit, results_queue):
+    """Entry point of the process of a portfolio member."""
+    isolateProcess(mem_limit)
+    method, model = _parseMember(member)
+
+    try:
+        results = RACE_METHODS[method](
+            instance = instance,
+            timeout = timeout,
+            cache = {},
+            random_seed = random_seed,
+            models_filter = [model],
+            mem_limit = mem_limit
+        )
+        result = results.get(model)
+        if result is None:
+            raise ValueError(f"Model {model} not found in method {method}")
+    except Exception as e:
+        result = {
+            "time": timeout,
+            "optimal": False,
+            "obj": None,
+            "sol": None,
+            "_extras": { "crash_reason": f"python_error: {e}" }
+        }
+    results_queue.put((member, result))
+
+
+def race(instance, portfolio, timeout, random_seed=42, mem_limit=-1):
+    """Runs all the members of the portfolio concurrently on an instance.
+
+    The race stops as soon as a member finds an optimal solution (obj == 1), or when all members are done.
+    If no member is optimal, the best solution found (if any) is returned.
+    A member that dies without reporting a result (e.g. killed by the OOM killer) is marked as crashed
+    within DEATH_POLL_INTERVAL seconds, instead of holding the race until the timeout.
+    """
+    results_queue = multiprocessing.Queue()
+    oom_kills = oomKillCount()
+    start_time = time.monotonic()
+    processes = {
+        member: multiprocessing.Process(
+            target = _runMember, 
+            args = (member, instance, timeout, random_seed, mem_limit, results_queue)
+        )
+        for member in portfolio
+    }
+    for process in processes.values():
+        process.start()
+
+    members_status = { member: { "status": "killed", "time": None, "obj": None } for member in portfolio }
+    pending = set(portfolio)
+    winner, winner_result, winner_time = None, None, None
+    try:
+        while len(pending) > 0:
+            # Members get a small grace period over the timeout to report their result
+            remaining_time = timeout + 10 - (time.monotonic() - start_time)
+            if remaining_time <= 0:
+                logger.warning(f"Race on instance {instance} reached the timeout")
+                break
+            try:
+                member, result = results_queue.get(timeout=min(remaining_time, DEATH_POLL_INTERVAL))
+            except queue.Empty:
+                # A member killed by a signal (e.g. by the OOM killer) never reports a result
+                for member in [member for member in pending if processes[member].exitcode not in [None, 0]]:
+                    crash_reason = exitCrashReason(processes[member].exitcode, mem_limit, oom_kills)
+                    member_time = time.monotonic() - start_time
+                    members_status[member] = { "status": "crashed", "time": member_time, "obj": None, "crash_reason": crash_reason }
+                    pending.remove(member)
+                    logger.warning(f"Member {member} died after {member_time:.2f} s without a result. Reason: {crash_reason}")
+                continue
+            if member not in pending:
+                continue
+            pending.remove(member)
+            member_time = time.monotonic() - start_time
+            if result["sol"] is not None:
+                status = "optimal" if result["obj"] == 1 else "suboptimal"
+            elif result.get("_extras", {}).get("crash_reason") is not None:
+                status = "crashed"
+            else:
+                status = "no-solution"
+            members_status[member] = {
+                "status": status,
+                "time": member_time,
+                "obj": result["obj"]
+            }
+            logger.info(f"Member {member} finished in {member_time:.2f} s with objective {result['obj']}")
+
+            if (result["sol"] is not None) and (result["obj"] is not None):
+                if (winner_result is None) or (result["obj"] < winner_result["obj"]):
+                    winner, winner_result, winner_time = member, result, member_time
+            if (result["sol"] is not None) and (result["obj"] == 1):
+                break
+    finally:
+        for process in processes.values():
+            killProcessTree(process)
+
+    wall_time = time.monotonic() - start_time
+    return {
+        "time": timeout if winner is None else winner_time,
+        "optimal": (winner_result is not None) and (winner_result["obj"] == 1),
+        "obj": None if winner_result is None else winner_result["obj"],
+        "sol": None if winner_result is None else winner_result["sol"],
+        "_extras": {
+            "winner": winner,
+            "time_to_answer": winner_time,
+            "wall_time": wall_time,
+            "members": members_status
+        }
+    }
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="Portfolio racer")
+    parser.add_argument("--timeout", type=int, default=300, help="Timeout in seconds")
+    parser.add_argument("--output-path", type=str, default="./res", help="Results directory")
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--instances", type=lambda arg: [int(i) for i in arg.split(",")], required=False, 
+                        default=[6,8,10,12,14,16,18,20], help="Instances to solve, comma separated")
+    parser.add_argument("--portfolio", type=lambda arg: arg.split(","), required=False, default=DEFAULT_PORTFOLIO, 
+                        help="Portfolio members in the format <method>:<model>, comma separated")
+    parser.add_argument("--seed", type=int, required=False, default=42, help="Seed for random operations")
+    parser.add_argument("--mem-limit", type=int, required=False, default=-1, help="Memory usage limit of each member in MB")
+    parser.add_argument("--runner-label", type=str, required=False, default="", help="Name of the machine that is executing")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARN,
+        format = "%(asctime)s %(levelname)-5s %(message)s",
+        datefmt = "%d-%m-%Y %H:%M:%S"
+    )
+
+    for member in args.portfolio:
+        _parseMember(member)
+
+    race_dir = os.path.join(args.output_path, "RACE/")
+    os.makedirs(race_dir, exist_ok=True)
+
+    for instance in args.instances:
+        logger.info(f"Starting race on instance {instance} with {args.portfolio}")
+        result = race(instance, args.portfolio, args.timeout, args.seed, args.mem_limit)
+        result["_extras"]["runner"] = args.runner_label
+        logger.info(f"Instance {instance} won by {result['_extras']['winner']} in {result['_extras']['time_to_answer']} s")
+
+        results_file_path = os.path.join(race_dir, f"{instance}.json")
+        with open(results_file_path, "w") as f:
+            logger.info(f"Saving results in {results_file_path}")
+            json.dump({ "portfolio": result }, f, indent=3)
@@ -14,8 +14,45 @@ def formatObjective(res):
         return f"{res['obj']}"
 
 
+def formatTime(res):
+    """Median time across seeds (interquartile range) in benchmark mode, the time of the single run otherwise."""
+    benchmark = res.get("_extras", {}).get("benchmark")
+    if benchmark is not None:
+        return f"{benchmark['median_time']:.1f} ({benchmark['iqr_time']:.1f})"
+    elif res["sol"] is None:
+        return "--"
+    else:
+        return f"{res['time']:.1f}"
+
+
+def formatSuccessRate(res):
+    benchmark = res.get("_extras", {}).get("benchmark")
+    if benchmark is not None:
+        return f"{benchmark['success_rate'] * 100:.0f}\\%"
+    else:
+        return "100\\%" if res["sol"] is not None else "0\\%"
+
+
+def formatPAR2(res):
+    benchmark = res.get("_extras", {}).get("benchmark")
+    if benchmark is not None:
+        return f"{benchmark['par2']:.1f}"
+    else:
+        return "--"
+
+
+# Column to tabulate -> formatting function of a result
+FORMATTERS = {
+    "obj": formatObjective,
+    "time": formatTime,
+    "success": formatSuccessRate,
+    "par2": formatPAR2,
+}
+
+
 if __name__ == "__main__":
     res_dir = sys.argv[1]
+    format_result = FORMATTERS[sys.argv[2] if len(sys.argv) > 2 else "obj"]
     results = {}
 
     for res_name in os.listdir(res_dir):
@@ -24,9 +61,10 @@ if __name__ == "__main__":
         with open(os.path.join(res_dir, res_name), "r") as f:
             results[instance_num] = json.load(f)
 
-    models = [ *results[1].keys() ]
-    models_latex = [ m.replace("_", "-") for m in models ]
     instances = sorted([ *results.keys() ])
+    # Models missing on some instances are still listed, with a dash
+    models = [ *dict.fromkeys(m for i in instances for m in results[i]) ]
+    models_latex = [ m.replace("_", "-") for m in models ]
 
     print(
         "\\begin{table}[h]\n" +
@@ -37,7 +75,7 @@ if __name__ == "__main__":
                 "\t\tId & " + " & ".join(models_latex) + " \\\\ \n" +
                 "\t\t\\midrule\n" +
                 "\t\t" + " \\\\ \n\t\t".join([
-                    f"{i} & " + " & \t".join([ formatObjective(results[i][m]) for m in models])
+                    f"{i} & " + " & \t".join([ format_result(results[i][m]) if m in results[i] else "--" for m in models])
                     for i in instances
                 ]) + " \\\\ \n" +
                 "\t\t\\bottomrule\n" +
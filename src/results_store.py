@@ -0,0 +1,130 @@
+"""Append-only journal of the experiment results.
+
+Every finished experiment is committed to the journal as a single JSON line as soon as it completes,
+so that a crash of the orchestrator loses at most the experiments that were running.
+The per-instance JSON result files can be regenerated from the journal at any time.
+"""
+import argparse
+import json
+import os
+import tempfile
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ResultsJournal:
+    """Results store keyed by (method, model, instance, seed, timeout), backed by a JSON lines file.
+
+    The journal is loaded once in memory, so lookups do not need to parse the file again.
+    Each record also keeps its position in the journal, so that the most recent run can be told apart.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        self.sequence = {}
+        self.next_sequence = 0
+        self.ends_with_newline = True
+        self.__load()
+
+    def __load(self):
+        if not os.path.isfile(self.path): return
+
+        with open(self.path, "rb") as f:
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                self.ends_with_newline = (f.read(1) == b"\n")
+
+        with open(self.path, "r") as f:
+            for line_num, line in enumerate(f):
+                if len(line.strip()) == 0: continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A partially written line is expected if the process was killed while appending
+                    logger.warning(f"Skipping corrupted line {line_num+1} of {self.path}")
+                    continue
+                self.__store(ResultsJournal.key(**record), record["result"])
+
+    def __store(self, key, result):
+        self.records[key] = result
+        self.sequence[key] = self.next_sequence
+        self.next_sequence += 1
+
+    @staticmethod
+    def key(method, model, instance, seed, timeout, **kwargs):
+        return (method, model, int(instance), seed, timeout)
+
+    def append(self, method, model, instance, seed, timeout, result):
+        """Durably commits the result of an experiment."""
+        record = {
+            "method": method,
+            "model": model,
+            "instance": instance,
+            "seed": seed,
+            "timeout": timeout,
+            "result": result
+        }
+        with open(self.path, "a") as f:
+            if not self.ends_with_newline:
+                # Terminates the partial line left by a killed process, so that the record is on its own line
+                f.write("\n")
+                self.ends_with_newline = True
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.__store(ResultsJournal.key(**record), result)
+
+    def lookup(self, method, instance, seed=None, timeout=None):
+        """Returns the results of an instance as {model: result}, optionally restricted to a seed and timeout.
+
+        If multiple runs of a model match, the most recently appended one is returned.
+        """
+        matches = sorted(
+            (key for key in self.records
+             if (key[0] == method) and (key[2] == instance) and
+                (seed is None or key[3] == seed) and (timeout is None or key[4] == timeout)),
+            key = lambda key: self.sequence[key]
+        )
+        # Later runs of a model overwrite the earlier ones
+        return { key[1]: self.records[key] for key in matches }
+
+    def instances(self):
+        """Returns all the (method, instance) pairs in the journal."""
+        return sorted(set( (method, instance) for method, _, instance, _, _ in self.records ))
+
+
+def writeJsonAtomic(path, data):
+    """Writes a JSON file through a temporary file in the same directory, replaced in a single step.
+
+    A process killed while writing leaves the previous version of the file intact instead of a truncated one.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=3)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="Results journal")
+    parser.add_argument("command", type=str, choices=["export"])
+    parser.add_argument("--output-path", type=str, default="./res", help="Results directory containing the journal")
+    parser.add_argument("--seed", type=int, required=False, default=None, help="Only export the runs with this seed")
+    parser.add_argument("--timeout", type=int, required=False, default=None, help="Only export the runs with this timeout")
+    args = parser.parse_args()
+
+    journal = ResultsJournal(os.path.join(args.output_path, ".journal.jsonl"))
+
+    if args.command == "export":
+        for method, instance in journal.instances():
+            instance_results = journal.lookup(method, instance, args.seed, args.timeout)
+            if len(instance_results) == 0: continue
+
+            out_dir = os.path.join(args.output_path, method.upper())
+            os.makedirs(out_dir, exist_ok=True)
+            writeJsonAtomic(os.path.join(out_dir, f"{instance}.json"), instance_results)
@@ -0,0 +1,294 @@
+"""Literal-level CNF backend for the SAT models.
+
+Formulas are built from integer literals (DIMACS convention, negative for negation) and kept in
+negation normal form as ("and", children) / ("or", children) tuples. Adding a formula to the solver
+clausifies it with a polarity-aware Tseitin transformation (only the implication towards the
+subformula is needed in NNF) into a flat array of literals, which can be dumped as DIMACS or solved
+by a CDCL engine through PySAT. With the "z3" engine, the clauses are bulk-loaded into a Z3 solver
+as DIMACS right before solving, so no Z3 term is allocated while building the model. The time spent
+loading the clauses into the engine counts against the timeout of the check.
+"""
+
+from array import array
+import io
+import threading
+import time
+
+from z3 import sat, unsat, unknown, Bool, BoolVal, Not, Solver, is_true
+
+try:
+    from pysat.solvers import Solver as PySATSolver
+except ImportError:
+    PySATSolver = None
+
+
+class CNFModel:
+    """Assignment found by the CNF solver, queried with the same interface as a Z3 model."""
+    def __init__(self, model):
+        self.values = bytearray(max([abs(lit) for lit in model], default=0) + 1)
+        for lit in model:
+            if lit > 0:
+                self.values[lit] = 1
+
+    def variable_value(self, var):
+        return (var < len(self.values)) and (self.values[var] == 1)
+
+    def value(self, expr):
+        if isinstance(expr, tuple):
+            op, children = expr
+            values = [self.value(child) for child in children]
+            return all(values) if op == "and" else any(values)
+        value = self.variable_value(abs(expr))
+        return value if expr > 0 else not value
+
+    def eval(self, expr, model_completion=False):
+        return BoolVal(self.value(expr))
+
+
+class Z3CNFModel(CNFModel):
+    """Assignment found by Z3 on the DIMACS clauses. Z3 names variable i with the integer symbol i."""
+    def __init__(self, model):
+        self.model = model
+
+    def variable_value(self, var):
+        return is_true(self.model.eval(Bool(var), model_completion=True))
+
+
+class CNFSolver:
+    """Clause sink with the subset of the Z3 API used by the SAT models.
+
+    The formula constructors (Bool, FreshBool, BoolVal, Not, And, Or, Implies, Iff, is_false) mirror
+    the Z3 functions, so that the encodings can be written once for both backends.
+    The engine is "z3" or any PySAT solver name supporting interruption (e.g. glucose42, glucose4,
+    minisat22), which is needed to enforce the timeout. With the "z3" engine, make_z3_solver creates
+    the Z3 solver the clauses are loaded into.
+    """
+    def __init__(self, engine="glucose42", make_z3_solver=Solver):
+        self.engine = engine
+        self.make_z3_solver = make_z3_solver
+        self.timeout = None
+
+        # Clauses stored as a flat array of literals, each clause terminated by 0
+        self.literals = array("i")
+        self.num_clauses = 0
+        self.num_vars = 0
+
+        # Literal defined by the Tseitin transformation of each subformula
+        self.definitions = {}
+
+        # Variable 1 is the constant true
+        self.TRUE = self.new_var()
+        self.FALSE = -self.TRUE
+        self.add_clause([self.TRUE])
+
+        # Incremental state of the underlying engine
+        self.engine_solver = None
+        self.loaded_literals = 0
+        self.loaded_clauses = 0
+        self.last_model = None
+
+    def new_var(self):
+        self.num_vars += 1
+        return self.num_vars
+
+    def add_clause(self, clause):
+        self.literals.extend(clause)
+        self.literals.append(0)
+        self.num_clauses += 1
+
+    def clauses(self, start=0):
+        """Iterate the clauses stored from the given position of the literal array."""
+        clause = []
+        for lit in self.literals[start:]:
+            if lit == 0:
+                yield clause
+                clause = []
+            else:
+                clause.append(lit)
+
+    # Formula constructors
+
+    def Bool(self, name=None):
+        return self.new_var()
+
+    def FreshBool(self, prefix=None):
+        return self.new_var()
+
+    def BoolVal(self, value):
+        return self.TRUE if value else self.FALSE
+
+    def is_false(self, expr):
+        return expr == self.FALSE
+
+    def Not(self, expr):
+        if isinstance(expr, tuple):
+            op, children = expr
+            return ("or" if op == "and" else "and", tuple(self.Not(child) for child in children))
+        return -expr
+
+    def __junction(self, op, args):
+        # Accept both And(a, b, ...) and And([a, b, ...]) as Z3 does
+        if (len(args) == 1) and isinstance(args[0], (list, tuple)) and not (isinstance(args[0], tuple) and args[0][0] in ("and", "or")):
+            args = args[0]
+        absorbing, neutral = (self.FALSE, self.TRUE) if op == "and" else (self.TRUE, self.FALSE)
+
+        children = []
+        for arg in args:
+            # Flatten nested junctions of the same type
+            if isinstance(arg, tuple) and arg[0] == op:
+                children.extend(arg[1])
+            elif arg == absorbing:
+                return absorbing
+            elif arg != neutral:
+                children.append(arg)
+
+        if len(children) == 0:
+            return neutral
+        if len(children) == 1:
+            return children[0]
+        return (op, tuple(children))
+
+    def And(self, *args):
+        return self.__junction("and", args)
+
+    def Or(self, *args):
+        return self.__junction("or", args)
+
+    def Implies(self, a, b):
+        return self.Or(self.Not(a), b)
+
+    def Iff(self, a, b):
+        return self.And(self.Or(self.Not(a), b), self.Or(a, self.Not(b)))
+
+    # Clausification
+
+    def __literal(self, expr):
+        """Literal that implies expr (Plaisted-Greenbaum: formulas in NNF only occur positively)."""
+        if not isinstance(expr, tuple):
+            return expr
+        if expr not in self.definitions:
+            lit = self.new_var()
+            self.definitions[expr] = lit
+            op, children = expr
+            if op == "and":
+                for child in children:
+                    self.__add(child, [-lit])
+            else:
+                self.add_clause([-lit] + [self.__literal(child) for child in children])
+        return self.definitions[expr]
+
+    def __add(self, expr, prefix=[]):
+        """Add the clauses of (prefix or expr)."""
+        if not isinstance(expr, tuple):
+            self.add_clause(prefix + [expr])
+            return
+        op, children = expr
+        if op == "and":
+            for child in children:
+                self.__add(child, prefix)
+        else:
+            self.add_clause(prefix + [self.__literal(child) for child in children])
+
+    def add(self, *exprs):
+        for expr in exprs:
+            if isinstance(expr, list):
+                self.add(*expr)
+            else:
+                self.__add(expr)
+
+    # Solving
+
+    def set(self, key, value):
+        if key == "timeout":
+            self.timeout = value / 1000
+        else:
+            raise ValueError(f"Unsupported option {key} for the CNF solver")
+
+    def check(self, *assumptions):
+        """Solve the clauses under the given assumptions. Returns Z3's sat, unsat or unknown."""
+        assumptions = [self.__literal(assumption) for assumption in assumptions]
+
+        if self.engine == "z3":
+            return self.__check_z3(assumptions)
+        return self.__check_pysat(assumptions)
+
+    def __remaining_time(self, start_time):
+        """Time left to the check started at start_time, or None without a timeout."""
+        if self.timeout is None:
+            return None
+        return self.timeout - (time.time() - start_time)
+
+    def __check_z3(self, assumptions):
+        start_time = time.time()
+
+        # Bulk-load the clauses added since the last call
+        if self.engine_solver is None:
+            self.engine_solver = self.make_z3_solver()
+        dimacs = io.StringIO()
+        self.to_dimacs(dimacs, self.loaded_literals, self.num_clauses - self.loaded_clauses)
+        self.engine_solver.from_string(dimacs.getvalue())
+        del dimacs
+        self.loaded_literals, self.loaded_clauses = len(self.literals), self.num_clauses
+
+        # The loading counts against the timeout
+        remaining_time = self.__remaining_time(start_time)
+        if remaining_time is not None:
+            if remaining_time <= 0:
+                return unknown
+            self.engine_solver.set("timeout", max(int(remaining_time * 1000), 1))
+        status = self.engine_solver.check([Bool(lit) if lit > 0 else Not(Bool(-lit)) for lit in assumptions])
+
+        if status == sat:
+            self.last_model = Z3CNFModel(self.engine_solver.model())
+        return status
+
+    def __check_pysat(self, assumptions):
+        if PySATSolver is None:
+            raise ImportError("The CNF backend requires PySAT (pip install python-sat)")
+
+        start_time = time.time()
+
+        # Load the clauses added since the last call
+        if self.engine_solver is None:
+            self.engine_solver = PySATSolver(name=self.engine)
+        self.engine_solver.append_formula(self.clauses(self.loaded_literals))
+        self.loaded_literals, self.loaded_clauses = len(self.literals), self.num_clauses
+
+        # Interrupt the engine when the rest of the timeout expires
+        timer = None
+        remaining_time = self.__remaining_time(start_time)
+        if remaining_time is not None:
+            if remaining_time <= 0:
+                return unknown
+            timer = threading.Timer(remaining_time, self.engine_solver.interrupt)
+            timer.start()
+        try:
+            status = self.engine_solver.solve_limited(assumptions=assumptions, expect_interrupt=True)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            self.engine_solver.clear_interrupt()
+
+        if status is None:
+            return unknown
+        if status:
+            self.last_model = CNFModel(self.engine_solver.get_model())
+            return sat
+        return unsat
+
+    def model(self):
+        return self.last_model
+
+    def statistics(self):
+        return {
+            "vars": self.num_vars,
+            "clauses": self.num_clauses,
+            "literals": len(self.literals) - self.num_clauses
+        }
+
+    def to_dimacs(self, file, start=0, num_clauses=None):
+        """Write the clauses in DIMACS format to a file object."""
+        file.write(f"p cnf {self.num_vars} {self.num_clauses if num_clauses is None else num_clauses}\n")
+        for clause in self.clauses(start):
+            file.write(" ".join(map(str, clause)) + " 0\n")
+
@@ -1,38 +1,56 @@
 from z3 import *
 import itertools
+import math
 
 class CardinalityConstraints:
     """Helper class that implements various cardinality constraints for a Z3-based SAT."""
 
+    # Counter (totalizer or sorting_network) whose unary outputs are shared by at_most_k, at_least_k and exactly_k
+    cardinality_counter = None
+
+    # Formula constructors, bound to the clause sink of the CNF backend by the models
+    Bool = staticmethod(Bool)
+    FreshBool = staticmethod(FreshBool)
+    BoolVal = staticmethod(BoolVal)
+    Not = staticmethod(Not)
+    And = staticmethod(And)
+    Or = staticmethod(Or)
+    Implies = staticmethod(Implies)
+    is_false = staticmethod(is_false)
+
+    @staticmethod
+    def Iff(a, b):
+        return a == b
+
     def at_most_one_pairwise(self, vars):
         n = len(vars)
         constraints = []
 
         for i in range(n):
             for j in range(i + 1, n):
-                constraints.append(Not(And(vars[i], vars[j])))
+                constraints.append(self.Not(self.And(vars[i], vars[j])))
         
-        return And(*constraints)
+        return self.And(*constraints)
 
     def at_most_one_sequential(self, vars):
         n = len(vars)
         constraints = []
         
-        s = [FreshBool(f's_{i}') for i in range(n-1)]
-        self.solver.add(Implies(vars[0], s[0]))
+        s = [self.FreshBool(f's_{i}') for i in range(n-1)]
+        self.solver.add(self.Implies(vars[0], s[0]))
         for i in range(1, n-1):
-            constraints.append(Implies(Or(vars[i], s[i-1]), s[i]))
-            constraints.append(Implies(s[i-1], Not(vars[i])))
-        constraints.append(Implies(s[n-2], Not(vars[n-1])))
+            constraints.append(self.Implies(self.Or(vars[i], s[i-1]), s[i]))
+            constraints.append(self.Implies(s[i-1], self.Not(vars[i])))
+        constraints.append(self.Implies(s[n-2], self.Not(vars[n-1])))
 
-        return And(*constraints)
+        return self.And(*constraints)
 
     def at_most_one_bitwise(self, vars):
         n = len(vars)
         constraints = []
 
         m = math.ceil(math.log2(n))
-        r = [FreshBool(f'r_{j}') for j in range(m)]
+        r = [self.FreshBool(f'r_{j}') for j in range(m)]
         for i in range(n):
             binary_repr = [(i >> j) & 1 for j in range(m)]
             binary_constraints = []
@@ -40,10 +58,10 @@ class CardinalityConstraints:
                 if binary_repr[j] == 1:
                     binary_constraints.append(r[j])
                 else:
-                    binary_constraints.append(Not(r[j]))
-            constraints.append(Implies(vars[i], And(binary_constraints)))
+                    binary_constraints.append(self.Not(r[j]))
+            constraints.append(self.Implies(vars[i], self.And(binary_constraints)))
         
-        return And(*constraints)
+        return self.And(*constraints)
 
     def at_most_one_heule(self, vars):
         n = len(vars)
@@ -51,51 +69,251 @@ class CardinalityConstraints:
             return self.at_most_one_pairwise(vars)
 
         constraints = [] 
-        y = FreshBool(f'y_heule')
+        y = self.FreshBool(f'y_heule')
         constraints.append(self.at_most_one_pairwise(vars[:3] + [y]))
-        remaining_vars = [Not(y)] + vars[3:]
+        remaining_vars = [self.Not(y)] + vars[3:]
         constraints.append(self.at_most_one_heule(remaining_vars))
 
-        return And(*constraints)
+        return self.And(*constraints)
 
     
     def at_most_k_pairwise(self, vars, k):
         n = len(vars)
         if k == 0:
-            return And(*[Not(v) for v in vars])
+            return self.And(*[self.Not(v) for v in vars])
         if n <= k:
-            return BoolVal(True)
+            return self.BoolVal(True)
         constraints = []
         
         for combo in itertools.combinations(range(n), k + 1):
-            clause = [Not(vars[i]) for i in combo]
-            constraints.append(Or(clause))
+            clause = [self.Not(vars[i]) for i in combo]
+            constraints.append(self.Or(clause))
         
-        return And(*constraints)
+        return self.And(*constraints)
 
     def at_most_k_sequential(self, vars, k):
         n = len(vars)
         if k == 0:
-            return And(*[Not(v) for v in vars])
+            return self.And(*[self.Not(v) for v in vars])
         if n <= k:
-            return BoolVal(True)
+            return self.BoolVal(True)
         constraints = []
 
-        s = [[FreshBool(f's_{i}_{j}') for j in range(k)] for i in range(n)]
-        constraints.append(Implies(vars[0], s[0][0]))
+        s = [[self.FreshBool(f's_{i}_{j}') for j in range(k)] for i in range(n)]
+        constraints.append(self.Implies(vars[0], s[0][0]))
         for j in range(1, k):
-            constraints.append(Not(s[0][j]))
+            constraints.append(self.Not(s[0][j]))
         for i in range(1, n - 1):
-            constraints.append(Implies(Or(vars[i], s[i-1][0]), s[i][0]))
+            constraints.append(self.Implies(self.Or(vars[i], s[i-1][0]), s[i][0]))
             for j in range(1, k):
                 constraints.append(
-                    Implies(Or(And(vars[i], s[i-1][j-1]), s[i-1][j]), s[i][j])
+                    self.Implies(self.Or(self.And(vars[i], s[i-1][j-1]), s[i-1][j]), s[i][j])
                 )
-            constraints.append(Implies(s[i-1][k-1], Not(vars[i])))
-        constraints.append(Implies(s[n-2][k-1], Not(vars[n-1])))
+            constraints.append(self.Implies(s[i-1][k-1], self.Not(vars[i])))
+        constraints.append(self.Implies(s[n-2][k-1], self.Not(vars[n-1])))
 
-        return And(*constraints)
+        return self.And(*constraints)
     
+    def at_most_k_totalizer(self, vars, k):
+        n = len(vars)
+        if k == 0:
+            return self.And(*[self.Not(v) for v in vars])
+        if n <= k:
+            return self.BoolVal(True)
+
+        outputs = self.counter_outputs(self.totalizer, vars, k + 1)
+        return self.Not(outputs[k])
+
+    def at_most_k_network(self, vars, k):
+        n = len(vars)
+        if k == 0:
+            return self.And(*[self.Not(v) for v in vars])
+        if n <= k:
+            return self.BoolVal(True)
+
+        outputs = self.counter_outputs(self.sorting_network, vars, k + 1)
+        return self.Not(outputs[k])
+
+    def at_most_k_modulo_totalizer(self, vars, k):
+        """Modulo totalizer encoding (Ogawa et al., 2013).
+
+        The count is represented as p * upper + lower, with both digits in unary, which reduces the
+        clauses of the totalizer from O(n*k) to O(n*sqrt(k)). Only the clauses forcing the outputs up
+        are generated, so the encoding is valid in the at most direction only.
+        """
+        n = len(vars)
+        if k == 0:
+            return self.And(*[self.Not(v) for v in vars])
+        if n <= k:
+            return self.BoolVal(True)
+
+        p = max(2, math.ceil(math.sqrt(k + 1)))
+        k_upper, k_lower = divmod(k, p)
+        upper, lower = self.modulo_totalizer(vars, p, k_upper + 1)
+
+        # Forbid upper > k_upper and upper == k_upper with lower > k_lower
+        constraints = []
+        if k_upper < len(upper):
+            constraints.append(self.Not(upper[k_upper]))
+        if k_lower < len(lower):
+            if k_upper == 0:
+                constraints.append(self.Not(lower[k_lower]))
+            else:
+                constraints.append(self.Or(self.Not(upper[k_upper - 1]), self.Not(lower[k_lower])))
+
+        return self.And(*constraints)
+
+    def counter_outputs(self, counter, vars, upper):
+        """Unary outputs of the given counter over vars, with at least `upper` outputs.
+
+        The outputs are cached, so that constraints over the same variables (e.g. an at most k and an
+        at least k) share a single encoding.
+        """
+        if not hasattr(self, "counter_cache"):
+            self.counter_cache = {}
+        key = (counter.__name__, tuple(v.get_id() if is_expr(v) else v for v in vars))
+
+        if (key not in self.counter_cache) or (len(self.counter_cache[key]) < min(upper, len(vars))):
+            self.counter_cache[key] = counter(vars, upper)
+        return self.counter_cache[key]
+
+    def totalizer(self, vars, upper=None):
+        """Totalizer encoding of the number of true variables (Bailleux and Boufkhad, 2003).
+
+        Returns the unary output literals: outputs[j] is true iff at least j+1 variables are true.
+        Only the first `upper` outputs are created. The defining clauses are added to the solver, so the
+        outputs can be used both as constraints and as assumptions.
+        """
+        if upper is None:
+            upper = len(vars)
+        upper = min(upper, len(vars))
+        if len(vars) == 1:
+            return list(vars[:upper])
+
+        left = self.totalizer(vars[:len(vars) // 2], upper)
+        right = self.totalizer(vars[len(vars) // 2:], upper)
+        outputs = [self.FreshBool('tot') for _ in range(min(len(left) + len(right), upper))]
+
+        # a_0 and b_0 are always true, a_{p+1} and b_{q+1} are always false
+        for i in range(len(left) + 1):
+            for j in range(len(right) + 1):
+                # At least i true on the left and at least j true on the right -> at least i+j true
+                if 0 < i + j <= len(outputs):
+                    clause = [outputs[i + j - 1]]
+                    if i > 0: clause.append(self.Not(left[i - 1]))
+                    if j > 0: clause.append(self.Not(right[j - 1]))
+                    self.solver.add(self.Or(clause))
+                # At most i true on the left and at most j true on the right -> at most i+j true
+                if i + j < len(outputs):
+                    clause = [self.Not(outputs[i + j])]
+                    if i < len(left): clause.append(left[i])
+                    if j < len(right): clause.append(right[j])
+                    self.solver.add(self.Or(clause))
+
+        return outputs
+
+    def sorting_network(self, vars, upper=None):
+        """Cardinality network based on Batcher's odd-even merge sort.
+
+        Returns the inputs sorted in decreasing order: outputs[j] is true iff at least j+1 variables are true.
+        Only the comparators needed to compute the first `upper` outputs are created and comparators
+        with constant inputs are simplified away. The defining clauses are added to the solver.
+        """
+        if upper is None:
+            upper = len(vars)
+        upper = min(upper, len(vars))
+
+        # Pad the inputs to a power of two with constant false wires
+        size = 1
+        while size < len(vars):
+            size *= 2
+        wires = list(vars) + [self.BoolVal(False)] * (size - len(vars))
+
+        def merge(lo, hi, r):
+            step = r * 2
+            if step < hi - lo:
+                yield from merge(lo, hi, step)
+                yield from merge(lo + r, hi, step)
+                yield from [(i, i + r) for i in range(lo + r, hi - r, step)]
+            else:
+                yield (lo, lo + r)
+
+        def sort(lo, hi):
+            if hi - lo >= 1:
+                mid = lo + (hi - lo) // 2
+                yield from sort(lo, mid)
+                yield from sort(mid + 1, hi)
+                yield from merge(lo, hi, 1)
+
+        comparators = list(sort(0, size - 1))
+
+        # Keep only the comparators that affect the required outputs
+        needed = [i < upper for i in range(size)]
+        used = []
+        for i, j in reversed(comparators):
+            if needed[i] or needed[j]:
+                needed[i] = needed[j] = True
+                used.append((i, j))
+
+        for i, j in reversed(used):
+            a, b = wires[i], wires[j]
+            if self.is_false(a) or self.is_false(b):
+                wires[i], wires[j] = (b if self.is_false(a) else a), self.BoolVal(False)
+                continue
+            high, low = self.FreshBool('net'), self.FreshBool('net')
+            # high <-> a or b, low <-> a and b
+            self.solver.add(self.Or(self.Not(a), high), self.Or(self.Not(b), high), self.Or(a, b, self.Not(high)))
+            self.solver.add(self.Or(self.Not(a), self.Not(b), low), self.Or(a, self.Not(low)), self.Or(b, self.Not(low)))
+            wires[i], wires[j] = high, low
+
+        return wires[:upper]
+
+    def modulo_totalizer(self, vars, p, upper_limit):
+        """Counts the true variables as p * upper + lower.
+
+        Returns the unary digits (upper, lower), with at most upper_limit upper outputs and
+        p-1 lower outputs. The defining clauses only force the outputs up.
+        """
+        if len(vars) == 1:
+            return [], list(vars)
+
+        left_upper, left_lower = self.modulo_totalizer(vars[:len(vars) // 2], p, upper_limit)
+        right_upper, right_lower = self.modulo_totalizer(vars[len(vars) // 2:], p, upper_limit)
+
+        lower = [self.FreshBool('mtot_l') for _ in range(min(len(vars), p - 1))]
+        upper = [self.FreshBool('mtot_u') for _ in range(min(len(vars) // p, upper_limit))]
+        carry = self.FreshBool('mtot_c')
+
+        # Lower digit, a_0 and b_0 are always true
+        for i in range(len(left_lower) + 1):
+            for j in range(len(right_lower) + 1):
+                if i + j == 0:
+                    continue
+                premise = ([self.Not(left_lower[i - 1])] if i > 0 else []) + ([self.Not(right_lower[j - 1])] if j > 0 else [])
+                if i + j < p:
+                    self.solver.add(self.Or(premise + [carry, lower[i + j - 1]]))
+                else:
+                    self.solver.add(self.Or(premise + [carry]))
+                    if i + j > p:
+                        self.solver.add(self.Or(premise + [lower[i + j - p - 1]]))
+
+        # Upper digit, increased by the carry of the lower digit
+        for i in range(len(left_upper) + 1):
+            for j in range(len(right_upper) + 1):
+                premise = ([self.Not(left_upper[i - 1])] if i > 0 else []) + ([self.Not(right_upper[j - 1])] if j > 0 else [])
+                if (i + j > 0) and (len(upper) > 0):
+                    self.solver.add(self.Or(premise + [upper[min(i + j, len(upper)) - 1]]))
+                if i + j + 1 <= len(upper):
+                    self.solver.add(self.Or(premise + [self.Not(carry), upper[i + j]]))
+                elif len(upper) == upper_limit:
+                    # Saturated output
+                    self.solver.add(self.Or(premise + [self.Not(carry), upper[-1]]))
+                else:
+                    # Not enough variables for another carry
+                    self.solver.add(self.Or(premise + [self.Not(carry)]))
+
+        return upper, lower
+
     def at_most_one_z3(self, vars):
         return AtMost(*vars, 1)
     
@@ -109,15 +327,24 @@ class CardinalityConstraints:
         pass
 
     def at_least_one(self, vars):
-        return Or(vars)
+        return self.Or(vars)
 
     def at_least_k(self, vars, k):
         n = len(vars)
-        negated_vars = [Not(var) for var in vars]
+        if k <= 0:
+            return self.BoolVal(True)
+        if k > n:
+            return self.BoolVal(False)
+        # Counter-based encodings read the bound off the same outputs used by at_most_k
+        if self.cardinality_counter is not None:
+            return self.counter_outputs(self.cardinality_counter, vars, k)[k - 1]
+        negated_vars = [self.Not(var) for var in vars]
         return self.at_most_k(negated_vars, n - k)
 
     def exactly_one(self, vars):
-        return And(self.at_most_one(vars), self.at_least_one(vars))
+        return self.And(self.at_most_one(vars), self.at_least_one(vars))
 
     def exactly_k(self, vars, k):
-        return And(self.at_most_k(vars, k), self.at_least_k(vars, k))
\ No newline at end of file
+        if self.cardinality_counter is not None:
+            self.counter_outputs(self.cardinality_counter, vars, k + 1)
+        return self.And(self.at_most_k(vars, k), self.at_least_k(vars, k))
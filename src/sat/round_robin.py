@@ -0,0 +1,80 @@
+"""SAT solver that uses a round-robin model."""
+
+from z3 import *
+
+from .slot_based import SlotBasedSolver
+
+class RoundRobinSAT(SlotBasedSolver):
+    """Use the circle method (=round robin method) to fix the matches of each week.
+
+    The period constraint does not hold in the circle method schedule and is imposed through SAT.
+    The parity rule already makes the schedule optimal.
+    The decision variables self.slots_of[w][i][p] form, for each week w, a permutation matrix: the
+    i-th match of the circle method in week w is played in period p.
+    Encodings and backends are selected as in SlotBasedSolver.
+    symmetry_constraint_mask enables the fixed period order of the first week, implied_constraint_mask
+    enables every team playing in every period.
+    """
+    def create_variables(self):
+        """Fix the matches of each week with the circle method and initialize the decision variables."""
+        # Matches of the circle method, with 0-based teams
+        self.matches = [[None for i in self.PERIODS] for w in self.WEEKS]
+        circle = list(self.TEAMS)
+        for w in self.WEEKS:
+            for i in self.PERIODS:
+                team_a, team_b = circle[i], circle[self.n - i - 1]
+                team_a, team_b = min(team_a, team_b), max(team_a, team_b)
+                if (team_a + team_b) % 2 == 1: # Use parity rule for balancing
+                    team_a, team_b = team_b, team_a
+                self.matches[w][i] = (team_a, team_b)
+            circle = circle[:1] + circle[-1:] + circle[1:-1]
+
+        # Create decision variables
+        self.slots_of = [[[
+            self.Bool(f"slots_of_{w}_{i}_{p}")
+            for p in self.PERIODS]
+            for i in self.PERIODS]
+            for w in self.WEEKS
+        ]
+
+    def create_constraints(self):
+        """Add main constraints to the solver."""
+        # Each match is played in exactly one period and each period gets exactly one match
+        for w in self.WEEKS:
+            for i in self.PERIODS:
+                self.solver.add(self.exactly_one([self.slots_of[w][i][p] for p in self.PERIODS]))
+            for p in self.PERIODS:
+                self.solver.add(self.exactly_one([self.slots_of[w][i][p] for i in self.PERIODS]))
+
+        # Each team plays at most twice in the same period
+        for t in self.TEAMS:
+            matches_t = [(w, i) for w in self.WEEKS for i in self.PERIODS if t in self.matches[w][i]]
+            for p in self.PERIODS:
+                self.solver.add(self.at_most_k([self.slots_of[w][i][p] for w, i in matches_t], 2))
+
+        # **** IMPLIED CONSTRAINTS ****
+        if self.implied_constraint(0):
+            # Every team plays at least once in every period
+            for t in self.TEAMS:
+                matches_t = [(w, i) for w in self.WEEKS for i in self.PERIODS if t in self.matches[w][i]]
+                for p in self.PERIODS:
+                    self.solver.add(self.at_least_one([self.slots_of[w][i][p] for w, i in matches_t]))
+
+        # **** SYMMETRY-BREAKING CONSTRAINTS ****
+        if self.symmetry_constraint(0):
+            # Fix the order of matches in the first week
+            for i in self.PERIODS:
+                self.solver.add(self.slots_of[0][i][i])
+
+    def format_solution(self):
+        """Format solution for export."""
+        # Initialize solution
+        self.sol = [[None for w in self.WEEKS] for p in self.PERIODS]
+
+        # Populate solution
+        for w in self.WEEKS:
+            for i in self.PERIODS:
+                for p in self.PERIODS:
+                    if self.model.eval(self.slots_of[w][i][p]):
+                        team_a, team_b = self.matches[w][i]
+                        self.sol[p][w] = [team_a + 1, team_b + 1]
@@ -1,23 +1,58 @@
 """SAT solver and optimizer that uses a slot-based model."""
 
 from z3 import *
+import platform
 import time
 
 from .constraints import CardinalityConstraints
+from .cnf import CNFSolver
+from timings import PhaseTimer, BUILD, SOLVE, EXTRACTION
+from z3_utils import makeSolver
+
+#check if the platform is not Windows
+if platform.system() != "Windows":
+    import resource
 
 class SlotBasedSolver(CardinalityConstraints):
     """Solve STS problem in Z3 SAT using a slot-based model. No optimization.
 
     The at_most_one_encoding and at_most_k_encoding parameters can be used to customize the
     cardinality constraint encoding. 
+    Unless Z3's own cardinality constraints are selected, the model is built as integer-literal
+    CNF and only loaded into Z3 right before solving. With backend="cnf", the clauses are
+    solved by the PySAT engine cnf_engine instead of Z3.
+    With aux_variables=True, "team t plays in (p,w)" and "t1 plays t2 in (p,w)" are defined once
+    as auxiliary variables and shared by all the constraints instead of being re-derived inline.
+    symmetry_constraint_mask enables, in order: the fixed first week, the weeks ordered by the
+    opponent of team 1 and team 1 playing its single match of a period in the first period.
+    implied_constraint_mask enables every team playing in every period, which together with the
+    at-most-twice rule means once in one period and twice in the others.
+    With the Z3 backend, tactic and params select the tactic pipeline and the options of the Z3
+    solver (see makeSolver), and random_seed seeds it.
     """
-    def __init__(self, instance, timeout=300, at_most_one_encoding="pairwise", at_most_k_encoding="pairwise"):
+    def __init__(self, instance, timeout=300, at_most_one_encoding="pairwise", at_most_k_encoding="pairwise", backend="z3", cnf_engine="glucose42", aux_variables=False, symmetry_constraint_mask=None, implied_constraint_mask=None, tactic=None, params=None, random_seed=None):
         # Start timer
         self.start_time = time.time()
+        self.timer = PhaseTimer(BUILD)
 
         # Store parameters
         self.n = instance
         self.timeout = timeout
+        self.backend = backend
+        self.cnf_engine = cnf_engine
+        self.at_most_one_encoding = at_most_one_encoding
+        self.at_most_k_encoding = at_most_k_encoding
+        self.aux_variables = aux_variables
+        self.symmetry_constraint_mask = symmetry_constraint_mask or []
+        self.implied_constraint_mask = implied_constraint_mask or []
+        self.tactic = tactic
+        self.params = params or {}
+        self.random_seed = random_seed
+
+        if (backend == "cnf") and ("z3" in (at_most_one_encoding, at_most_k_encoding)):
+            raise ValueError("Z3 cardinality constraints are not available with the CNF backend")
+        if (backend == "cnf") and ((tactic is not None) or (len(self.params) > 0)):
+            raise ValueError("Z3 tactics and options are not available with the CNF backend")
 
         # Set the chosen cardinality constraint encoding
         match at_most_one_encoding:
@@ -36,6 +71,14 @@ class SlotBasedSolver(CardinalityConstraints):
                 self.at_most_k = self.at_most_k_pairwise
             case "sequential":
                 self.at_most_k = self.at_most_k_sequential
+            case "totalizer":
+                self.at_most_k = self.at_most_k_totalizer
+                self.cardinality_counter = self.totalizer
+            case "network":
+                self.at_most_k = self.at_most_k_network
+                self.cardinality_counter = self.sorting_network
+            case "modulo_totalizer":
+                self.at_most_k = self.at_most_k_modulo_totalizer
             case "z3":
                 self.at_most_k = self.at_most_k_z3
 
@@ -44,6 +87,7 @@ class SlotBasedSolver(CardinalityConstraints):
         self.create_solver()
         self.create_variables()
         self.create_constraints()
+        self.timer.end()
         
     def create_parameters(self):
         """Compute the parameters of the STS problem and initialize the associated ranges."""
@@ -60,21 +104,92 @@ class SlotBasedSolver(CardinalityConstraints):
 
     def create_solver(self):
         """Initialize solver."""
-        self.solver = Solver()
+        # Z3's cardinality constraints need Z3 terms, every other encoding is built as clauses
+        if (self.backend == "z3") and ("z3" in (self.at_most_one_encoding, self.at_most_k_encoding)):
+            self.solver = makeSolver(self.tactic, self.params, self.random_seed)
+        else:
+            self.solver = CNFSolver(
+                "z3" if self.backend == "z3" else self.cnf_engine,
+                lambda: makeSolver(self.tactic, self.params, self.random_seed)
+            )
+            # Build the formulas on the literals of the clause sink
+            for name in ["Bool", "FreshBool", "BoolVal", "Not", "And", "Or", "Implies", "Iff", "is_false"]:
+                setattr(self, name, getattr(self.solver, name))
         self.solver.set("timeout", int(self.timeout * 1000))
 
+    def symmetry_constraint(self, i):
+        """Whether the i-th symmetry-breaking constraint is enabled."""
+        return i < len(self.symmetry_constraint_mask) and self.symmetry_constraint_mask[i]
+
+    def implied_constraint(self, i):
+        """Whether the i-th implied constraint is enabled."""
+        return i < len(self.implied_constraint_mask) and self.implied_constraint_mask[i]
+
     def create_variables(self):
         """Initialize the decision variables."""
         self.teams = [[[[
-            Bool(f"teams_{p}_{w}_{s}_{t}")
+            self.Bool(f"teams_{p}_{w}_{s}_{t}")
             for t in self.TEAMS]
             for s in self.SLOTS]
             for w in self.WEEKS]
             for p in self.PERIODS
         ]
 
+        if self.aux_variables:
+            self.plays_vars = [[[
+                self.Bool(f"plays_{t}_{p}_{w}")
+                for w in self.WEEKS]
+                for p in self.PERIODS]
+                for t in self.TEAMS
+            ]
+            self.match_vars = {
+                (t1, t2): [[self.Bool(f"match_{t1}_{t2}_{p}_{w}") for w in self.WEEKS] for p in self.PERIODS]
+                for t1 in self.TEAMS for t2 in self.TEAMS if t1 < t2
+            }
+
+    def plays(self, t, p, w):
+        """Team t plays in period p of week w."""
+        if self.aux_variables:
+            return self.plays_vars[t][p][w]
+        return self.Or(self.teams[p][w][0][t], self.teams[p][w][1][t])
+
+    def match(self, t1, t2, p, w):
+        """Teams t1 < t2 play against each other in period p of week w."""
+        if self.aux_variables:
+            return self.match_vars[(t1, t2)][p][w]
+        return self.Or(
+            self.And(self.teams[p][w][0][t1], self.teams[p][w][1][t2]),
+            self.And(self.teams[p][w][0][t2], self.teams[p][w][1][t1])
+        )
+
+    def create_aux_constraints(self):
+        """Define the auxiliary variables with their Tseitin clauses."""
+        for p in self.PERIODS:
+            for w in self.WEEKS:
+                for t in self.TEAMS:
+                    home, away, plays = self.teams[p][w][0][t], self.teams[p][w][1][t], self.plays_vars[t][p][w]
+                    # plays <-> home or away
+                    self.solver.add(self.Or(self.Not(home), plays), self.Or(self.Not(away), plays), self.Or(self.Not(plays), home, away))
+
+                for (t1, t2), match_vars in self.match_vars.items():
+                    home_1, away_1 = self.teams[p][w][0][t1], self.teams[p][w][1][t1]
+                    home_2, away_2 = self.teams[p][w][0][t2], self.teams[p][w][1][t2]
+                    match = match_vars[p][w]
+                    # match <-> (home_1 and away_2) or (home_2 and away_1)
+                    self.solver.add(
+                        self.Or(self.Not(match), home_1, home_2),
+                        self.Or(self.Not(match), home_1, away_1),
+                        self.Or(self.Not(match), away_2, home_2),
+                        self.Or(self.Not(match), away_2, away_1),
+                        self.Or(self.Not(home_1), self.Not(away_2), match),
+                        self.Or(self.Not(home_2), self.Not(away_1), match)
+                    )
+
     def create_constraints(self):
         """Add main constraints to the solver."""
+        if self.aux_variables:
+            self.create_aux_constraints()
+
         # Every period+week+slot combination can be assigned to exactly a single team
         for p in self.PERIODS:
             for w in self.WEEKS:
@@ -90,10 +205,7 @@ class SlotBasedSolver(CardinalityConstraints):
             for t2 in self.TEAMS:
                 if t1 < t2:
                     matches_12 = [
-                        Or(
-                            And(self.teams[p][w][0][t1], self.teams[p][w][1][t2]),
-                            And(self.teams[p][w][0][t2], self.teams[p][w][1][t1])
-                        )
+                        self.match(t1, t2, p, w)
                         for p in self.PERIODS
                         for w in self.WEEKS
                     ]
@@ -103,10 +215,7 @@ class SlotBasedSolver(CardinalityConstraints):
         for w in self.WEEKS:
             for t in self.TEAMS:
                 matches_tw = [
-                    Or(
-                        self.teams[p][w][0][t],
-                        self.teams[p][w][1][t]
-                    )
+                    self.plays(t, p, w)
                     for p in self.PERIODS
                 ]
                 self.solver.add(self.exactly_one(matches_tw))
@@ -115,14 +224,53 @@ class SlotBasedSolver(CardinalityConstraints):
         for t in self.TEAMS:
             for p in self.PERIODS:
                 matches_tp = [
-                    Or(
-                        self.teams[p][w][0][t],
-                        self.teams[p][w][1][t]
-                    )
+                    self.plays(t, p, w)
                     for w in self.WEEKS
                 ]
                 self.solver.add(self.at_most_k(matches_tp, 2))
 
+        # **** IMPLIED CONSTRAINTS ****
+        if self.implied_constraint(0):
+            # Every team plays at least once in every period
+            for t in self.TEAMS:
+                for p in self.PERIODS:
+                    self.solver.add(self.at_least_one([self.plays(t, p, w) for w in self.WEEKS]))
+
+        # **** SYMMETRY-BREAKING CONSTRAINTS ****
+        if self.symmetry_constraint(0):
+            # Fix the first week to teams 2p (home) and 2p+1 (away) in period p
+            for p in self.PERIODS:
+                self.solver.add(self.teams[p][0][0][2 * p], self.teams[p][0][1][2 * p + 1])
+
+        if self.symmetry_constraint(1):
+            # Order the weeks by the opponent of team 1
+            opponent = [[self.Bool(f"opponent_{w}_{t}") for t in self.TEAMS] for w in self.WEEKS]
+            for w in self.WEEKS:
+                for t in range(1, self.n):
+                    for p in self.PERIODS:
+                        self.solver.add(self.Implies(self.match(0, t, p, w), opponent[w][t]))
+            for w in range(self.weeks - 1):
+                for t1 in range(1, self.n):
+                    for t2 in range(1, t1 + 1):
+                        self.solver.add(self.Or(self.Not(opponent[w][t1]), self.Not(opponent[w + 1][t2])))
+
+        if self.symmetry_constraint(2):
+            # Team 1 plays its single match of a period in the first period
+            self.solver.add(self.exactly_one([self.plays(0, 0, w) for w in self.WEEKS]))
+
+    def extras(self):
+        """Statistics of the model building, reported in the results."""
+        extras = {
+            "timings": self.timer.end()
+        }
+        if platform.system() != "Windows":
+            # Peak memory of the whole process (in kilobytes on Linux), not only of this model: it is the
+            # one of the experiment only when the model is solved in its own process (see solveIsolated)
+            extras["process_peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        if isinstance(self.solver, CNFSolver):
+            extras.update(self.solver.statistics())
+        return extras
+
     def format_solution(self):
         """Format solution for export."""
         # Initialize solution
@@ -152,8 +300,14 @@ class SlotBasedSolver(CardinalityConstraints):
 
     def solve(self):
         """Solve the STS satisfiability problem."""
+        # The model building counts against the timeout
+        remaining_time = self.timeout - (time.time() - self.start_time)
+        self.solver.set("timeout", max(int(remaining_time * 1000), 1))
+
         # Look for a solution
+        self.timer.begin(SOLVE)
         status = self.solver.check()
+        self.timer.end()
 
         # End timer and compute execution time
         end_time = time.time()
@@ -162,9 +316,11 @@ class SlotBasedSolver(CardinalityConstraints):
         # If the problem is sat, extract a well-formatted solution and print out the objective value and
         # whether the solution is optimal
         if status == sat:
+            self.timer.begin(EXTRACTION)
             self.model = self.solver.model()
             self.format_solution()
             self.compute_objective()
+            self.timer.end()
             self.obj = self.max_imbalance
             self.optimal = self.obj == 1
         else:
@@ -178,6 +334,7 @@ class SlotBasedSolver(CardinalityConstraints):
             "optimal": self.optimal,
             "obj": self.obj,
             "sol": self.sol,
+            "_extras": self.extras()
         }
         return self.results
     
@@ -185,9 +342,11 @@ class SlotBasedOptimizer(SlotBasedSolver):
     """Solve the STS problem maximizing the number of balanced teams with a Z3-powered MAXSAT approach.
     
     A team is optimized if abs(num_home_games - num_away_games) < 1.
+    The number of balanced teams is encoded once with a totalizer and the lower bound is tightened
+    incrementally through assumptions, so the solver keeps its learned clauses across iterations.
     """
-    def __init__(self, instance, timeout=300, at_most_one_encoding="pairwise", at_most_k_encoding="pairwise"):
-        super().__init__(instance, timeout, at_most_one_encoding, at_most_k_encoding)
+    def __init__(self, instance, timeout=300, at_most_one_encoding="pairwise", at_most_k_encoding="pairwise", backend="z3", cnf_engine="glucose42", aux_variables=False, symmetry_constraint_mask=None, implied_constraint_mask=None, tactic=None, params=None, random_seed=None):
+        super().__init__(instance, timeout, at_most_one_encoding, at_most_k_encoding, backend, cnf_engine, aux_variables, symmetry_constraint_mask, implied_constraint_mask, tactic, params, random_seed)
 
         # Prepare for optimization
         self.optimal = False
@@ -197,7 +356,7 @@ class SlotBasedOptimizer(SlotBasedSolver):
         super().create_variables()
 
         # Create optimization variables
-        self.balanced = [Bool(f"balanced_{t}") for t in self.TEAMS]
+        self.balanced = [self.Bool(f"balanced_{t}") for t in self.TEAMS]
 
     def create_constraints(self):
         super().create_constraints()
@@ -205,10 +364,13 @@ class SlotBasedOptimizer(SlotBasedSolver):
         # Add optimization constraints
         for t in self.TEAMS:
             home_matches = [self.teams[p][w][0][t] for p in self.PERIODS for w in self.WEEKS]
-            self.solver.add(And(
+            self.solver.add(self.Iff(self.And(
                     self.at_most_k(home_matches, self.n // 2),
                     self.at_least_k(home_matches, self.n // 2 - 1)
-                ) == self.balanced[t])
+                ), self.balanced[t]))
+
+        # Unary counter of the balanced teams: at_least_balanced[k] is true iff at least k+1 teams are balanced
+        self.at_least_balanced = self.totalizer(self.balanced)
 
     def compute_objective(self):
         """Compute value of objective function, i.e. number of balanced teams."""
@@ -216,25 +378,34 @@ class SlotBasedOptimizer(SlotBasedSolver):
 
     def solve(self):
         """Solve the satisfiability problem iteratively maximizing the objective."""
+        self.sol = None
+        self.obj = None
+
         while not self.optimal:
-            # Add optimization constraints
-            self.solver.add(self.at_least_k(self.balanced, self.num_balanced_teams + 1))
+            # Each check gets the time left
+            remaining_time = self.timeout - (time.time() - self.start_time)
+            if remaining_time <= 0:
+                break
+            self.solver.set("timeout", int(remaining_time * 1000))
 
-            # Look for a solution
-            status = self.solver.check()
+            # Look for a solution with more balanced teams than the current one
+            self.timer.begin(SOLVE)
+            status = self.solver.check(self.at_least_balanced[self.num_balanced_teams])
+            self.timer.end()
             
             # If the problem is sat, extract a well-formatted solution and compute number of non-balanced teams
             if status == sat:
+                self.timer.begin(EXTRACTION)
                 self.model = self.solver.model()
                 self.format_solution()
                 self.compute_objective()
+                self.timer.end()
                 self.obj = self.n - self.num_balanced_teams
                 self.optimal = (self.obj == 0)
-            # If the problem is not sat, breaks and return empty solution
+            # If the problem is not sat, stop and keep the best solution found (if any)
             else:
-                self.sol = None
-                self.obj = None
-                self.optimal = None
+                if self.sol is None:
+                    self.optimal = None
                 break
         
         # End timer and compute execution time
@@ -247,6 +418,7 @@ class SlotBasedOptimizer(SlotBasedSolver):
             "time": self.exec_time,
             "optimal": self.optimal,
             "obj": self.obj,
-            "sol": self.sol
+            "sol": self.sol,
+            "_extras": self.extras()
         }
-        return self.results
\ No newline at end of file
+        return self.results
@@ -1,11 +1,18 @@
 from .slot_based import SlotBasedSolver, SlotBasedOptimizer
+from .round_robin import RoundRobinSAT
+from process_utils import solveIsolated
 import gc
 
 import logging
 logger = logging.getLogger(__name__)
 
 at_most_one_encodings = ["z3", "pairwise", "sequential", "heule", "bitwise"]
-at_most_k_encodings = ["z3", "pairwise", "sequential"]
+at_most_k_encodings = ["z3", "pairwise", "sequential", "totalizer", "network", "modulo_totalizer"]
+
+# Encodings of the symmetry-breaking and implied constraint variants. The pairwise at most k grows
+# combinatorially and times out from n = 8, the sequential counter is dominated by the totalizer-based ones.
+competitive_at_most_one_encodings = ["z3", "heule", "bitwise"]
+competitive_at_most_k_encodings = ["z3", "totalizer", "network", "modulo_totalizer"]
 
 experiments = [
     {
@@ -21,44 +28,111 @@ experiments = [
         "name": f"optimizer_{one_enc}_{k_enc}",
         "model": SlotBasedOptimizer,
         "at_most_one_encoding": one_enc,
+        "at_most_k_encoding": k_enc
+    }
+    for one_enc in at_most_one_encodings
+    for k_enc in at_most_k_encodings
+] + [
+    # Explicit plays/match variables shared by the constraints
+    {
+        "name": f"{model_name}_aux_{one_enc}_{k_enc}",
+        "model": model,
+        "at_most_one_encoding": one_enc,
         "at_most_k_encoding": k_enc,
-        "instance_limit": 10
+        "aux_variables": True
     }
+    for model_name, model in [("solver", SlotBasedSolver), ("optimizer", SlotBasedOptimizer)]
     for one_enc in at_most_one_encodings
     for k_enc in at_most_k_encodings
+] + [
+    {
+        "name": f"round_robin_{one_enc}_{k_enc}",
+        "model": RoundRobinSAT,
+        "at_most_one_encoding": one_enc,
+        "at_most_k_encoding": k_enc
+    }
+    for one_enc in at_most_one_encodings
+    for k_enc in at_most_k_encodings
+] + [
+    # Symmetry-breaking and implied constraints
+    {
+        "name": f"{model_name}_{variant}_{one_enc}_{k_enc}",
+        "model": model,
+        "at_most_one_encoding": one_enc,
+        "at_most_k_encoding": k_enc,
+        "symmetry_constraint_mask": [variant != "implied"] * num_symmetry_constraints,
+        "implied_constraint_mask": [variant != "symm"]
+    }
+    for model_name, model, num_symmetry_constraints in [("solver", SlotBasedSolver, 3), ("optimizer", SlotBasedOptimizer, 3), ("round_robin", RoundRobinSAT, 1)]
+    for variant in ["symm", "implied", "full"]
+    for one_enc in competitive_at_most_one_encodings
+    for k_enc in competitive_at_most_k_encodings
+] + [
+    # Integer-literal CNF solved by Glucose through PySAT
+    {
+        "name": f"glucose_{model_name}_{one_enc}_{k_enc}",
+        "model": model,
+        "at_most_one_encoding": one_enc,
+        "at_most_k_encoding": k_enc,
+        "backend": "cnf",
+        "cnf_engine": "glucose42"
+    }
+    for model_name, model in [("solver", SlotBasedSolver), ("optimizer", SlotBasedOptimizer), ("round_robin", RoundRobinSAT)]
+    for one_enc in at_most_one_encodings if one_enc != "z3"
+    for k_enc in at_most_k_encodings if k_enc != "z3"
+] + [
+    # Z3 tactic pipelines and options on Z3's own cardinality constraints
+    {
+        "name": f"{model_name}_z3_z3_{preset}",
+        "model": model,
+        "at_most_one_encoding": "z3",
+        "at_most_k_encoding": "z3",
+        **z3_config
+    }
+    for model_name, model in [("solver", SlotBasedSolver), ("optimizer", SlotBasedOptimizer), ("round_robin", RoundRobinSAT)]
+    for preset, z3_config in [
+        ("pb2bv", {"tactic": ["simplify", "pb2bv", "sat"]}),
+        ("card2bv", {"tactic": ["simplify", "card2bv", "sat"]}),
+        ("no_card_solver", {"params": {"sat.cardinality.solver": False}}),
+    ]
 ]
 
-def solve(instance, timeout, cache={}, random_seed=42, models_filter=None, **kwargs):
+def list_models():
+    return [experiment["name"] for experiment in experiments]
+
+def _solveExperiment(experiment, instance, timeout, random_seed):
+    """Build and solve the model of an experiment, run in the child process of solveIsolated."""
+    return experiment["model"](instance,
+                               timeout=timeout,
+                               at_most_one_encoding=experiment["at_most_one_encoding"],
+                               at_most_k_encoding=experiment["at_most_k_encoding"],
+                               backend=experiment.get("backend", "z3"),
+                               cnf_engine=experiment.get("cnf_engine", "glucose42"),
+                               aux_variables=experiment.get("aux_variables", False),
+                               symmetry_constraint_mask=experiment.get("symmetry_constraint_mask"),
+                               implied_constraint_mask=experiment.get("implied_constraint_mask"),
+                               tactic=experiment.get("tactic"),
+                               params=experiment.get("params"),
+                               random_seed=random_seed if experiment.get("backend", "z3") == "z3" else None,
+                           ).solve()
+
+def solve(instance, timeout, cache={}, random_seed=42, models_filter=None, mem_limit=-1, **kwargs):
     results = {}
     
     for experiment in experiments:
         if (models_filter is not None) and (experiment["name"] not in models_filter):
             continue
         logger.info(f"Starting model {experiment['name']}")
-        name, model, at_most_one_encoding, at_most_k_encoding = experiment["name"], experiment["model"], experiment["at_most_one_encoding"], experiment["at_most_k_encoding"]
+        name = experiment["name"]
 
         # Check if result is in cache00
         if name in cache:
             logger.info(f"Cache hit")
             results[name] = cache[name]
             continue
-        
-        if ("instance_limit" in experiment) and (instance >= experiment["instance_limit"]):
-            logger.info(f"Model {name} skip instance {instance}")
-            results[name] =  {
-                "time": timeout,
-                "optimal": False,
-                "obj": None,
-                "sol": None
-            }
-            continue
-            
-        
-        results[name] = model(instance,
-                              timeout=timeout,
-                              at_most_one_encoding=at_most_one_encoding,
-                              at_most_k_encoding=at_most_k_encoding,
-                        ).solve()
+
+        # Build and solve the model in a child process, killed if it outlives the timeout
+        results[name] = solveIsolated(_solveExperiment, (experiment, instance, timeout, random_seed), timeout, mem_limit)
 
         gc.collect()
 
@@ -0,0 +1,61 @@
+"""Checks the cardinality encodings against brute-force enumeration. Run from src with: python -m pytest sat"""
+import itertools
+import pytest
+from z3 import sat
+from sat.cnf import CNFSolver
+from sat.constraints import CardinalityConstraints
+
+ENCODINGS = ["pairwise", "sequential", "totalizer", "network", "modulo_totalizer"]
+COUNTERS = {"totalizer": "totalizer", "network": "sorting_network"}
+
+
+class Encoder(CardinalityConstraints):
+    """Cardinality constraints built on the CNF backend, with the at_most_k encoding of the models."""
+    def __init__(self, encoding):
+        self.solver = CNFSolver()
+        for name in ["Bool", "FreshBool", "BoolVal", "Not", "And", "Or", "Implies", "Iff", "is_false"]:
+            setattr(self, name, getattr(self.solver, name))
+        self.at_most_k = getattr(self, f"at_most_k_{encoding}")
+        if encoding in COUNTERS:
+            self.cardinality_counter = getattr(self, COUNTERS[encoding])
+
+
+def satisfied_assignments(encoder, vars, constraint):
+    """Assignments of vars (as tuples of booleans) under which the constraint is satisfiable."""
+    guard = encoder.Bool()
+    encoder.solver.add(encoder.Implies(guard, constraint))
+    return {
+        values for values in itertools.product([False, True], repeat=len(vars))
+        if encoder.solver.check(guard, *[v if value else encoder.Not(v) for v, value in zip(vars, values)]) == sat
+    }
+
+
+def expected_assignments(n, holds):
+    return {values for values in itertools.product([False, True], repeat=n) if holds(sum(values))}
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+@pytest.mark.parametrize("n", range(1, 7))
+def test_at_most_k(encoding, n):
+    for k in range(0, n + 2):
+        encoder = Encoder(encoding)
+        vars = [encoder.Bool() for _ in range(n)]
+        assert satisfied_assignments(encoder, vars, encoder.at_most_k(vars, k)) == expected_assignments(n, lambda count: count <= k)
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+@pytest.mark.parametrize("n", range(1, 7))
+def test_at_least_k(encoding, n):
+    for k in range(-1, n + 2):
+        encoder = Encoder(encoding)
+        vars = [encoder.Bool() for _ in range(n)]
+        assert satisfied_assignments(encoder, vars, encoder.at_least_k(vars, k)) == expected_assignments(n, lambda count: count >= k)
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+@pytest.mark.parametrize("n", range(1, 7))
+def test_exactly_k(encoding, n):
+    for k in range(0, n + 1):
+        encoder = Encoder(encoding)
+        vars = [encoder.Bool() for _ in range(n)]
+        assert satisfied_assignments(encoder, vars, encoder.exactly_k(vars, k)) == expected_assignments(n, lambda count: count == k)
@@ -1,14 +1,28 @@
 import time
 from z3 import *
+from timings import PhaseTimer, BUILD, COMPILE, SOLVE, EXTRACTION
+from z3_utils import makeSolver
+from ...smtlib_utils import SMTLIB_SOLVERS, SMTLIBModel, smtlibScript, smtlibSolve, smtlibRace
 
 class BaseSolver:
     """Base class to solve (up to satisfiability or optimization) the STS problem with z3 SMT.
     
     To subclass, implement missing functions.
+    With engine set to one of SMTLIB_SOLVERS, the assertions are exported to SMT-LIB2 and solved
+    by that external solver instead of Z3 (satisfiability only). With engine="portfolio", all the
+    external solvers supporting the logic race on the script and the first answer wins.
+    With the Z3 engine, tactic and params select the tactic pipeline and the options of the solver
+    (see makeSolver), and random_seed seeds it.
     """
-    def __init__(self, instance, timeout=300, implied_constraints=False, symmetry_constraints=False, optimization=False, **kwargs):
+    # SMT-LIB2 logic of the assertions
+    logic = "QF_LIA"
+    # Whether every solution of the model has the minimum imbalance of 1, so that no objective is needed
+    balanced = False
+
+    def __init__(self, instance, timeout=300, implied_constraints=False, symmetry_constraints=False, optimization=False, engine="z3", tactic=None, params=None, random_seed=None, **kwargs):
         # Start timer
         self.start_time = time.time()
+        self.timer = PhaseTimer(BUILD)
 
         # Store parameters
         self.n = instance
@@ -16,12 +30,28 @@ class BaseSolver:
         self.implied_constraints = implied_constraints
         self.symmetry_constraints = symmetry_constraints
         self.optimization = optimization
+        self.engine = engine
+        self.tactic = tactic
+        self.params = params or {}
+        self.random_seed = random_seed
+
+        if engine != "z3":
+            if optimization:
+                raise ValueError("Optimization is only available with the Z3 engine")
+            if (engine != "portfolio") and (self.logic not in SMTLIB_SOLVERS[engine]["logics"]):
+                raise ValueError(f"Logic {self.logic} is not supported by {engine}")
 
         # Create model
+        self.tracking_literal = None
         self.create_parameters()
         self.create_solver()
         self.create_variables()
         self.create_constraints()
+        if self.implied_constraints:
+            self.create_implied_constraints()
+        if self.symmetry_constraints:
+            self.create_symmetry_constraints()
+        self.timer.end()
 
     def create_parameters(self):
         """Compute the parameters of the STS problem and initialize the associated ranges."""
@@ -38,7 +68,7 @@ class BaseSolver:
 
     def create_solver(self):
         """Initialize solver."""
-        self.solver = Optimize() if self.optimization else Solver()
+        self.solver = makeSolver(self.tactic, self.params, self.random_seed)
         self.solver.set("timeout", int(self.timeout * 1000))
 
     def create_variables(self):
@@ -49,63 +79,202 @@ class BaseSolver:
         """Create batches of constraints to add to the solver."""
         pass
 
+    def create_implied_constraints(self):
+        """Create the implied constraints, added through add_constraints."""
+        pass
+
+    def create_symmetry_constraints(self):
+        """Create the symmetry-breaking constraints, added through add_constraints."""
+        pass
+
+    def add_constraints(self, *constraints):
+        """Add constraints of an optional group, guarded by the tracking literal of the group if set."""
+        if self.tracking_literal is None:
+            self.solver.add(*constraints)
+        else:
+            self.solver.add([Implies(self.tracking_literal, constraint) for constraint in constraints])
+
     def create_objective(self):
-        """Create minimization objective function.
-        
-        Use maximum absolute imbalance between numbers of home and away games.
+        """Create the difference between numbers of home and away games of every team.
+
+        The objective is the maximum absolute difference, bounded through bound_objective.
         """
-        counts = [[Int(f"home_count_{t}_{s}") for s in self.SLOTS] for t in self.TEAMS]
-        imbalances = [Int(f"imbalance_{t}") for t in self.TEAMS]        
-        
+        self.imbalances = [Int(f"imbalance_{t}") for t in self.TEAMS]
+
         for t in self.TEAMS:
-            for s in self.SLOTS:
-                count = Sum([
+            counts = [
+                Sum([
                     If(self.teams[p][w][s] == t, 1, 0)
-                    for p in self.PERIODS 
+                    for p in self.PERIODS
                     for w in self.WEEKS
                 ])
-                self.solver.add(counts[t][s] == count)
-            
-        for t in self.TEAMS:
-            diff = counts[t][0] - counts[t][1]
-            self.solver.add(imbalances[t] == If(diff >= 0, diff, -diff))
-                
-        self.max_imbalance = Int("max_imbalance")    
-        for t in self.TEAMS:
-            self.solver.add(self.max_imbalance >= imbalances[t])
-        self.solver.add(Or([self.max_imbalance == imbalances[t] for t in self.TEAMS]))
-        self.solver.add(self.max_imbalance >= 1)
+                for s in self.SLOTS
+            ]
+            self.solver.add(self.imbalances[t] == counts[0] - counts[1])
+
+    def bound_objective(self, bound):
+        """Literal that, when assumed, bounds the objective to at most bound."""
+        literal = Bool(f"max_imbalance_le_{bound}")
+        self.solver.add(Implies(literal, And([
+            And(imbalance <= bound, imbalance >= -bound)
+            for imbalance in self.imbalances
+        ])))
+        return literal
+
+    def compute_objective(self):
+        """Maximum absolute difference between numbers of home and away games in the solution."""
+        imbalances = [0 for t in self.TEAMS]
+        for period in self.sol:
+            for team_a, team_b in period:
+                imbalances[team_a - 1] += 1
+                imbalances[team_b - 1] -= 1
+        return max([abs(imbalance) for imbalance in imbalances])
+
+    def smtlib_variables(self):
+        """Uninterpreted constants of the assertions."""
+        variables, visited = {}, set()
+        stack = list(self.solver.assertions())
+        while len(stack) > 0:
+            expr = stack.pop()
+            if expr.get_id() in visited:
+                continue
+            visited.add(expr.get_id())
+            if is_const(expr) and (expr.decl().kind() == Z3_OP_UNINTERPRETED):
+                variables[str(expr)] = expr
+            else:
+                stack.extend(expr.children())
+        return list(variables.values())
+
+    def to_smtlib(self):
+        """Serialize the assertions to an SMT-LIB2 script printing the values of the variables if satisfiable."""
+        self.variables = self.smtlib_variables()
+        return smtlibScript(self.solver.sexpr(), self.logic, [str(variable) for variable in self.variables])
+
+    def check_smtlib(self):
+        """Solve the assertions with the external engine, returning Z3's sat, unsat or unknown."""
+        self.timer.begin(COMPILE)
+        script = self.to_smtlib()
+        self.timer.begin(SOLVE)
+        remaining_time = self.timeout - (time.time() - self.start_time)
+        if self.engine == "portfolio":
+            solvers = [solver for solver in SMTLIB_SOLVERS if self.logic in SMTLIB_SOLVERS[solver]["logics"]]
+            outcome, values = smtlibRace(script, solvers, max(int(remaining_time * 1000), 1))
+            self.extras["portfolio"] = {"winner": outcome["winner"], "members": outcome["members"]}
+        else:
+            outcome, values = smtlibSolve(script, self.engine, max(int(remaining_time * 1000), 1))
+        self.crash_reason = outcome["crash_reason"]
+        if self.crash_reason is not None:
+            return unknown
+        self.smtlib_model = SMTLIBModel(self.variables, values)
+        return {"sat": sat, "unsat": unsat}.get(outcome["status"], unknown)
 
     def solve(self):
-        """Solve the satisfiability problem."""
-        self.create_objective()
-        if self.optimization:
-            self.solver.minimize(self.max_imbalance)
+        """Solve the satisfiability or optimization problem."""
+        self.timer.begin(BUILD)
+        if self.optimization and not self.balanced:
+            self.create_objective()
+        return self.solve_model()
 
+    def solve_variants(self, variants):
+        """Solve several variants of the model incrementally, sharing the core model (Z3 engine only).
+
+        variants maps the name of each variant to its (symmetry_constraints, implied_constraints) flags.
+        The symmetry-breaking and the implied constraints are added once, each group guarded by a
+        tracking literal, then every variant is checked in its own push/pop scope assuming the literals
+        of its groups. The results of each variant are reported as if it was solved alone: its time and
+        timings include the construction of the core model and of its groups, and it gets the whole timeout.
+        """
+        if self.engine != "z3":
+            raise ValueError("Incremental solving is only available with the Z3 engine")
+
+        # Core model
+        self.timer.begin(BUILD)
+        if self.optimization and not self.balanced:
+            self.create_objective()
+        core_timings = dict(self.timer.end())
+        core_time = time.time() - self.start_time
+
+        # Tracked constraint groups
+        groups = {}
+        for group, create_group in [("symmetry", self.create_symmetry_constraints), ("implied", self.create_implied_constraints)]:
+            group_start = time.time()
+            self.tracking_literal = Bool(f"group_{group}")
+            create_group()
+            groups[group] = (self.tracking_literal, time.time() - group_start)
+        self.tracking_literal = None
+
+        results = {}
+        for name, (symmetry, implied) in variants.items():
+            enabled = [groups[group] for group, enable in [("symmetry", symmetry), ("implied", implied)] if enable]
+            build_time = core_time + sum([group_time for _, group_time in enabled])
+
+            self.start_time = time.time() - build_time
+            self.timer = PhaseTimer()
+            self.timer.timings = dict(core_timings)
+            self.timer.add(BUILD, build_time - core_time)
+            self.solver.set("timeout", max(int((self.timeout - build_time) * 1000), 1))
+
+            # The objective bounds of the variant are dropped with its scope
+            self.solver.push()
+            results[name] = self.solve_model(*[literal for literal, _ in enabled])
+            self.solver.pop()
+        return results
+
+    def solve_model(self, *assumptions):
+        """Check the assertions under the given assumptions and build the results dictionary.
+
+        The objective is computed from the solution. When optimizing, the search is repeated assuming
+        a tighter bound on the objective until it is proven optimal or the timeout expires.
+        """
         # Look for solution
-        status = self.solver.check()
+        self.crash_reason = None
+        self.extras = {}
+        self.timer.begin(SOLVE)
+        status = self.solver.check(*assumptions) if self.engine == "z3" else self.check_smtlib()
+        self.timer.end()
+
+        self.sol = None
+        self.obj = None
+        self.optimal = None
+        proven_optimal = False
+        while status == sat:
+            # Extract a well-formatted solution and its objective value
+            self.timer.begin(EXTRACTION)
+            self.model = self.solver.model() if self.engine == "z3" else self.smtlib_model
+            self.format_solution()
+            self.obj = self.compute_objective()
+            self.timer.end()
+            if (not self.optimization) or self.balanced or (self.obj == 1):
+                break
+
+            # Look for a better solution
+            remaining_time = self.timeout - (time.time() - self.start_time)
+            if remaining_time <= 0:
+                break
+            self.timer.begin(SOLVE)
+            self.solver.set("timeout", max(int(remaining_time * 1000), 1))
+            status = self.solver.check(*assumptions, self.bound_objective(self.obj - 1))
+            self.timer.end()
+            proven_optimal = status == unsat
+
+        # The imbalance is at least 1 as every team plays an odd number of games
+        if self.sol is not None:
+            self.optimal = (self.obj == 1) or proven_optimal
 
         # End timer and compute execution time
         end_time = time.time()
         self.exec_time = end_time - self.start_time
 
-        # If the problem is sat, extract a well-formatted solution and print out the objective value and
-        # whether the solution is optimal
-        if status == sat:
-            self.model = self.solver.model()
-            self.format_solution()
-            self.obj = self.model.eval(self.max_imbalance).as_long()
-            self.optimal = self.obj == 1
-        else:
-            self.sol = None
-            self.obj = None
-            self.optimal = None
-
         # Create output dictionary
         self.results = {
             "time": self.exec_time,
             "optimal": self.optimal,
             "obj": self.obj,
             "sol": self.sol,
+            "_extras": {
+                **self.extras,
+                "timings": self.timer.end(),
+                "crash_reason": self.crash_reason
+            }
         }
         return self.results
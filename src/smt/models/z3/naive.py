@@ -69,35 +69,33 @@ class NaiveSolver(BaseSolver):
                 ])
                 self.solver.add(matches_tp <= 2)
 
-        # **** IMPLIED CONSTRAINTS ****
-        if self.implied_constraints:
-            # No team plays against itself
-            for t in self.TEAMS:
-                matches_tt = Sum([
-                    If(And(
-                        self.teams[p][w][0] == t,
-                        self.teams[p][w][1] == t
-                    ), 1, 0)
+    def create_implied_constraints(self):
+        # No team plays against itself
+        for t in self.TEAMS:
+            matches_tt = Sum([
+                If(And(
+                    self.teams[p][w][0] == t,
+                    self.teams[p][w][1] == t
+                ), 1, 0)
+                for p in self.PERIODS
+                for w in self.WEEKS
+            ])
+            self.add_constraints(matches_tt == 0)
+
+    def create_symmetry_constraints(self):
+        # Order weeks by the sum of the weights of the teams playing home to break up the week symmetry
+        week_weights = []
+        for w in self.WEEKS:
+            week_weights.append(
+                Sum([
+                    If(self.teams[p][w][s] == t, self.team_weight(t), 0)
+                    for s in self.SLOTS
+                    for t in self.TEAMS
                     for p in self.PERIODS
-                    for w in self.WEEKS
                 ])
-                self.solver.add(matches_tt == 0)
-
-        # **** SYMMETRY-BREAKING CONSTRAINTS ****
-        if self.symmetry_constraints:
-            # Order weeks by the sum of the weights of the teams playing home to break up the week symmetry
-            week_weights = []
-            for w in self.WEEKS:
-                week_weights.append(
-                    Sum([
-                        If(self.teams[p][w][s] == t, self.team_weight(t), 0)
-                        for s in self.SLOTS
-                        for t in self.TEAMS
-                        for p in self.PERIODS
-                    ])
-                )
-            for w in range(self.weeks - 1):
-                self.solver.add(week_weights[w] <= week_weights[w + 1])
+            )
+        for w in range(self.weeks - 1):
+            self.add_constraints(week_weights[w] <= week_weights[w + 1])
 
     def format_solution(self):
         # Initialize solution
@@ -110,3 +108,95 @@ class NaiveSolver(BaseSolver):
                 team_b = self.model.eval(self.teams[p][w][1]).as_long() + 1
                 self.sol[p][w] = [team_a, team_b]
                 
+
+class PseudoBooleanNaiveSolver(NaiveSolver):
+    """Naive model with the cardinality constraints expressed as pseudo-Boolean constraints.
+
+    The slots are the same as in NaiveSolver, but no constraint sums If terms over Int variables:
+    the counts are PbEq/PbLe constraints over the slot assignments and the once-a-week rule is a
+    Distinct over the slots of each week. With one_hot set, every slot is also channelled to one Bool
+    per team and the pseudo-Boolean constraints are stated over these literals.
+    """
+
+    def __init__(self, instance, one_hot=False, **kwargs):
+        self.one_hot = one_hot
+        super().__init__(instance, **kwargs)
+
+    def create_variables(self):
+        super().create_variables()
+
+        if self.one_hot:
+            # Channel each slot to one Bool per team
+            self.assigned = [[[[
+                Bool(f"assigned_{p}_{w}_{s}_{t}")
+            for t in self.TEAMS]
+            for s in self.SLOTS]
+            for w in self.WEEKS]
+            for p in self.PERIODS]
+
+            for p in self.PERIODS:
+                for w in self.WEEKS:
+                    for s in self.SLOTS:
+                        self.solver.add(PbEq([(self.assigned[p][w][s][t], 1) for t in self.TEAMS], 1))
+                        for t in self.TEAMS:
+                            self.solver.add(self.assigned[p][w][s][t] == (self.teams[p][w][s] == t))
+
+    def plays_in_slot(self, p, w, s, t):
+        """Bool expression true iff team t plays at the given slot."""
+        if self.one_hot:
+            return self.assigned[p][w][s][t]
+        return self.teams[p][w][s] == t
+
+    def plays(self, p, w, t):
+        """Bool expression true iff team t plays at the given period and week."""
+        return Or(self.plays_in_slot(p, w, 0, t), self.plays_in_slot(p, w, 1, t))
+
+    def create_constraints(self):
+        # **** CORE CONSTRAINTS ****
+
+        # Every team plays against every other team over the course of the turnament
+        for t1 in self.TEAMS:
+            for t2 in self.TEAMS:
+                if t1 < t2:
+                    self.solver.add(PbEq([
+                        (Or(
+                            And(self.plays_in_slot(p, w, 0, t1), self.plays_in_slot(p, w, 1, t2)),
+                            And(self.plays_in_slot(p, w, 0, t2), self.plays_in_slot(p, w, 1, t1))
+                        ), 1)
+                        for p in self.PERIODS
+                        for w in self.WEEKS
+                    ], 1))
+
+        # Every team plays exactly once a week (n slots for n teams)
+        for w in self.WEEKS:
+            self.solver.add(Distinct([
+                self.teams[p][w][s]
+                for p in self.PERIODS
+                for s in self.SLOTS
+            ]))
+
+        # Every team plays at most 2 matches in any given period
+        for t in self.TEAMS:
+            for p in self.PERIODS:
+                self.solver.add(PbLe([(self.plays(p, w, t), 1) for w in self.WEEKS], 2))
+
+    def create_implied_constraints(self):
+        # No team plays against itself
+        for t in self.TEAMS:
+            self.add_constraints(PbEq([
+                (And(self.plays_in_slot(p, w, 0, t), self.plays_in_slot(p, w, 1, t)), 1)
+                for p in self.PERIODS
+                for w in self.WEEKS
+            ], 0))
+
+    def create_symmetry_constraints(self):
+        # Order weeks by the sum of the weights of the teams playing to break up the week symmetry
+        def week_weight(w, sign):
+            return [
+                (self.plays_in_slot(p, w, s, t), sign * self.team_weight(t))
+                for s in self.SLOTS
+                for t in self.TEAMS
+                for p in self.PERIODS
+            ]
+        for w in range(self.weeks - 1):
+            self.add_constraints(PbLe(week_weight(w, 1) + week_weight(w + 1, -1), 0))
@@ -12,10 +12,12 @@ class RoundRobinSolver(BaseSolver):
     More precisely, in the final solution, the match at self.teams[p][w] is supposed to actually take place 
     during period self.new_periods[p][w] in the same week.
     """
+    # The parity rule of the circle method balances home and away games
+    balanced = True
 
-    def create_variables(self):
-        # Create initial solution
-        self.teams = [[[Int(f"teams_{p}_{w}_{s}") for s in self.SLOTS] for w in self.WEEKS] for p in self.PERIODS]
+    def circle_schedule(self):
+        """Matches of the initial solution, as (home, away) teams indexed by period and week."""
+        schedule = [[None for w in self.WEEKS] for p in self.PERIODS]
         circle = list(self.TEAMS)
         for w in self.WEEKS:
             for p in self.PERIODS:
@@ -23,8 +25,18 @@ class RoundRobinSolver(BaseSolver):
                 team_a, team_b = min(team_a, team_b), max(team_a, team_b)
                 if (team_a + team_b) % 2 == 1: # Use parity rule for balancing
                     team_a, team_b = team_b, team_a
-                self.solver.add(self.teams[p][w][0] == team_a, self.teams[p][w][1] == team_b)
+                schedule[p][w] = (team_a, team_b)
             circle = circle[:1] + circle[-1:] + circle[1:-1]
+        return schedule
+
+    def create_variables(self):
+        # Create initial solution
+        self.schedule = self.circle_schedule()
+        self.teams = [[[Int(f"teams_{p}_{w}_{s}") for s in self.SLOTS] for w in self.WEEKS] for p in self.PERIODS]
+        for w in self.WEEKS:
+            for p in self.PERIODS:
+                team_a, team_b = self.schedule[p][w]
+                self.solver.add(self.teams[p][w][0] == team_a, self.teams[p][w][1] == team_b)
 
         # Create decision variables
         self.new_periods = [[Int(f"new_periods_{p}_{w}") for w in self.WEEKS] for p in self.PERIODS]
@@ -52,11 +64,11 @@ class RoundRobinSolver(BaseSolver):
                 ])
                 self.solver.add(count <= 2)
 
-        # **** SYMMETRY-BREAKING CONSTRAINTS ****
-        if self.symmetry_constraints:
-            # Fix the order of matches in the first week
-            for p in self.PERIODS:
-                self.solver.add(self.new_periods[p][0] == p)
+
+    def create_symmetry_constraints(self):
+        # Fix the order of matches in the first week
+        for p in self.PERIODS:
+            self.add_constraints(self.new_periods[p][0] == p)
 
 
     def format_solution(self):
@@ -72,11 +84,50 @@ class RoundRobinSolver(BaseSolver):
                 self.sol[new_p][w] = [team_a, team_b]
 
 
+class DistinctRoundRobinSolver(RoundRobinSolver):
+    """Like RoundRobinSolver, with smaller constraints exploiting the fixed initial solution.
+
+    The matches of each week are permuted by a Distinct over their new periods. As the initial
+    solution is known, the count of the matches of a team in a period only sums over the n - 1
+    matches of that team instead of all the (period, week) pairs.
+    """
+
+    def create_constraints(self):
+        # Each time slot (period, week) gets exactly one match
+        for w in self.WEEKS:
+            self.solver.add(Distinct([self.new_periods[p_old][w] for p_old in self.PERIODS]))
+
+        # Each team plays at most twice in the same period
+        for t in self.TEAMS:
+            matches = [
+                (p_old, w)
+                for p_old in self.PERIODS for w in self.WEEKS
+                if t in self.schedule[p_old][w]
+            ]
+            for p in self.PERIODS:
+                count = Sum([If(self.new_periods[p_old][w] == p, 1, 0) for p_old, w in matches])
+                self.solver.add(count <= 2)
+
+    def create_implied_constraints(self):
+        # Each time slot (period, week) gets exactly one match, stated as counts which help Z3 more than Distinct
+        for p in self.PERIODS:
+            for w in self.WEEKS:
+                count = Sum([
+                    If(self.new_periods[p_old][w] == p, 1, 0)
+                    for p_old in self.PERIODS
+                ])
+                self.add_constraints(count == 1)
+
+
 class BitVecRoundRobinSolver(BaseSolver):
     """Use the Round Robin method to generate an initial solution.
 
     Like RoundRobinSolver, but uses BitVec to represent periods.
     """
+    # Integer teams and bit-vector periods
+    logic = "ALL"
+    # The parity rule of the circle method balances home and away games
+    balanced = True
 
     def create_parameters(self):
         super().create_parameters()
@@ -124,11 +175,11 @@ class BitVecRoundRobinSolver(BaseSolver):
                 ])
                 self.solver.add(count <= 2)
         
-        # **** SYMMETRY-BREAKING CONSTRAINTS ****
-        if self.symmetry_constraints:
-            # Fix the order of matches in the first week 
-            for p in self.PERIODS:
-                self.solver.add(self.new_periods[p][0] == p)
+
+    def create_symmetry_constraints(self):
+        # Fix the order of matches in the first week
+        for p in self.PERIODS:
+            self.add_constraints(self.new_periods[p][0] == p)
 
 
     def format_solution(self):
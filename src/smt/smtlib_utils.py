@@ -0,0 +1,251 @@
+"""Helpers to run SMT-LIB2 scripts under external SMT solvers."""
+from subprocess import Popen, PIPE
+from z3 import IntVal, BitVecVal, BoolVal, BoolSort, is_bv_sort, substitute, simplify
+import os
+import time
+import shutil
+import queue
+import tempfile
+import threading
+import logging
+logger = logging.getLogger(__name__)
+
+# Jar of SMTInterpol, used when there is no smtinterpol launcher on the PATH
+SMTINTERPOL_JAR = os.environ.get("SMTINTERPOL_JAR", "/usr/local/share/smtinterpol.jar")
+
+
+def _smtinterpolCommand(path):
+    """Command line of SMTInterpol: the smtinterpol launcher if installed, otherwise the jar under java."""
+    launcher = shutil.which("smtinterpol")
+    if launcher is not None:
+        return [launcher, path]
+    if not os.path.isfile(SMTINTERPOL_JAR):
+        # Reported as a missing solver, like any command that is not installed
+        raise FileNotFoundError(SMTINTERPOL_JAR)
+    return ["java", "-jar", SMTINTERPOL_JAR, path]
+
+
+# External solvers: command line to run an SMT-LIB2 file and the logics they support
+SMTLIB_SOLVERS = {
+    "z3_smtlib": {
+        "command": lambda path: ["z3", "-smt2", path],
+        "logics": ["QF_LIA", "QF_BV", "ALL"]
+    },
+    "cvc5": {
+        "command": lambda path: ["cvc5", "--lang=smt2", path],
+        "logics": ["QF_LIA", "QF_BV", "ALL"]
+    },
+    "yices": {
+        "command": lambda path: ["yices-smt2", path],
+        "logics": ["QF_LIA", "QF_BV"]
+    },
+    "opensmt": {
+        "command": lambda path: ["opensmt", path],
+        "logics": ["QF_LIA"]
+    },
+    "smtinterpol": {
+        "command": _smtinterpolCommand,
+        "logics": ["QF_LIA"]
+    },
+}
+
+
+def smtlibScript(declarations_and_assertions, logic, variables):
+    """SMT-LIB2 script that checks the assertions and prints the values of the given variable names."""
+    return (
+        "(set-option :produce-models true)\n"
+        f"(set-logic {logic})\n"
+        f"{declarations_and_assertions}\n"
+        "(check-sat)\n"
+        f"(get-value ({' '.join(variables)}))\n"
+        "(exit)\n"
+    )
+
+
+def __parseSexpr(text):
+    """Parses an s-expression into nested lists of string tokens."""
+    tokens = text.replace("(", " ( ").replace(")", " ) ").split()
+    stack = [[]]
+    for token in tokens:
+        if token == "(":
+            stack.append([])
+        elif token == ")":
+            expr = stack.pop()
+            stack[-1].append(expr)
+        else:
+            stack[-1].append(token)
+    return stack[0][0] if len(stack[0]) > 0 else None
+
+
+def __runSolver(solver, script_path, timeout_ms, cancel=None):
+    """
+        Runs an external solver on an SMT-LIB2 file and returns its outcome and the printed values.
+
+        The output of the solver is streamed: the first line is the satisfiability status, followed by
+        the answer to get-value if the script is satisfiable. The solver is killed after timeout_ms,
+        or as soon as the cancel event is set (outcome["cancelled"] is then set).
+    """
+    outcome = {
+        "status": None,
+        "crash_reason": None,
+        "killed": False,
+        "cancelled": False
+    }
+    values = {}
+    cancel = cancel or threading.Event()
+
+    try:
+        with Popen(SMTLIB_SOLVERS[solver]["command"](script_path), stdout=PIPE, stderr=PIPE) as pipe:
+            def watchdog():
+                cancelled = cancel.wait(timeout_ms / 1000)
+                if pipe.poll() is None:
+                    outcome["killed"] = True
+                    outcome["cancelled"] = cancelled
+                    pipe.kill()
+            threading.Thread(target=watchdog, daemon=True).start()
+
+            values_output = ""
+            while True:
+                out_stream = pipe.stdout.readline().decode("utf-8")
+                if len(out_stream) <= 0: break
+                line = out_stream.strip()
+                if len(line) == 0: continue
+
+                if outcome["status"] is None:
+                    if line in ["sat", "unsat", "unknown"]:
+                        outcome["status"] = line
+                    elif line.startswith("(error"):
+                        outcome["crash_reason"] = f"smtlib_error: {line}"
+                        break
+                    else:
+                        logger.warning(f"Unexpected output from {solver}: {line}")
+                elif outcome["status"] != "sat":
+                    # get-value fails without a model
+                    continue
+                elif line.startswith("(error"):
+                    outcome["crash_reason"] = f"smtlib_error: {line}"
+                    break
+                else:
+                    values_output += f" {line}"
+
+            pipe.wait()
+            # Release the watchdog
+            cancel.set()
+            stderr_output = pipe.stderr.read().decode("utf-8")
+    except FileNotFoundError:
+        outcome["crash_reason"] = f"smtlib_error: {solver} is not installed"
+        return outcome, values
+
+    if outcome["killed"]:
+        outcome["status"] = "unknown"
+    elif pipe.returncode in [-6, -11]:
+        outcome["crash_reason"] = "out-of-memory"
+    elif (outcome["status"] is None) and (outcome["crash_reason"] is None):
+        outcome["crash_reason"] = f"smtlib_error: {stderr_output.strip()}"
+
+    if (outcome["status"] == "sat") and (outcome["crash_reason"] is None):
+        for name, value in __parseSexpr(values_output) or []:
+            values[name] = value
+    return outcome, values
+
+
+def __writeScript(script):
+    """Writes an SMT-LIB2 script to a temporary file and returns its path."""
+    with tempfile.NamedTemporaryFile("w", suffix=".smt2", delete=False) as f:
+        f.write(script)
+        return f.name
+
+
+def smtlibSolve(script, solver, timeout_ms):
+    """Runs an SMT-LIB2 script under an external solver and returns its outcome and the printed values."""
+    script_path = __writeScript(script)
+    try:
+        return __runSolver(solver, script_path, timeout_ms)
+    finally:
+        os.remove(script_path)
+
+
+def smtlibRace(script, solvers, timeout_ms):
+    """
+        Runs an SMT-LIB2 script under all the given solvers in parallel and returns the outcome and the
+        printed values of the first one that decides it (sat or unsat). The other solvers are then killed.
+
+        outcome["winner"] is the deciding solver (None if no solver decided the script) and
+        outcome["members"] reports the status and time in seconds of every solver.
+        outcome["crash_reason"] is only set if all the solvers crashed.
+    """
+    script_path = __writeScript(script)
+    start_time = time.monotonic()
+    answers = queue.Queue()
+    cancel = {solver: threading.Event() for solver in solvers}
+
+    def runMember(solver):
+        outcome, values = __runSolver(solver, script_path, timeout_ms, cancel[solver])
+        answers.put((solver, outcome, values, time.monotonic() - start_time))
+
+    for solver in solvers:
+        threading.Thread(target=runMember, args=(solver,), daemon=True).start()
+
+    winner, winner_outcome, winner_values = None, None, {}
+    members = {}
+    try:
+        # Every member returns by its own timeout at the latest
+        for _ in range(len(solvers)):
+            solver, outcome, values, member_time = answers.get()
+            members[solver] = {
+                "status": "cancelled" if outcome["cancelled"] else outcome["status"],
+                "crash_reason": outcome["crash_reason"],
+                "time": member_time
+            }
+            if (winner is None) and (outcome["crash_reason"] is None) and (outcome["status"] in ["sat", "unsat"]):
+                logger.info(f"{solver} decided the script in {member_time:.2f} s")
+                winner, winner_outcome, winner_values = solver, outcome, values
+                for other in solvers:
+                    cancel[other].set()
+    finally:
+        for solver in solvers:
+            cancel[solver].set()
+        os.remove(script_path)
+
+    if winner_outcome is None:
+        crash_reasons = [member["crash_reason"] for member in members.values()]
+        winner_outcome = {
+            "status": "unknown",
+            "crash_reason": crash_reasons[0] if all(crash_reasons) else None,
+            "killed": False,
+            "cancelled": False
+        }
+    winner_outcome = {**winner_outcome, "winner": winner, "members": members}
+    return winner_outcome, winner_values
+
+
+def _smtlibValue(value, sort):
+    """Z3 value of a constant printed by get-value."""
+    if sort == BoolSort():
+        return BoolVal(value == "true")
+    if is_bv_sort(sort):
+        if isinstance(value, list):
+            # (_ bvN size)
+            return BitVecVal(int(value[1][2:]), sort.size())
+        base = 2 if value.startswith("#b") else 16
+        return BitVecVal(int(value[2:], base), sort.size())
+    if isinstance(value, list):
+        # (- N)
+        return IntVal(-int(value[1]))
+    return IntVal(int(value))
+
+
+class SMTLIBModel:
+    """Assignment printed by an external solver, evaluated like a Z3 model."""
+    def __init__(self, variables, values):
+        self.substitutions = [
+            (variable, _smtlibValue(values[str(variable)], variable.sort()))
+            for variable in variables if str(variable) in values
+        ]
+        self.values = {variable.get_id(): value for variable, value in self.substitutions}
+
+    def eval(self, expr, model_completion=False):
+        # The decision variables are looked up directly, other expressions are simplified
+        if expr.get_id() in self.values:
+            return self.values[expr.get_id()]
+        return simplify(substitute(expr, *self.substitutions))
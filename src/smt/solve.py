@@ -1,5 +1,7 @@
-from .models.z3.naive import NaiveSolver
-from .models.z3.round_robin import RoundRobinSolver, BitVecRoundRobinSolver
+from .models.z3.naive import NaiveSolver, PseudoBooleanNaiveSolver
+from .models.z3.round_robin import RoundRobinSolver, DistinctRoundRobinSolver, BitVecRoundRobinSolver
+from .smtlib_utils import SMTLIB_SOLVERS
+from process_utils import solveIsolated
 import gc
 
 import logging
@@ -90,6 +92,34 @@ experiments = [
         "implied_constraint_mask": [True],
         "optimization": False,
     },
+    {
+        "name": "round_robin_distinct",
+        "model": DistinctRoundRobinSolver,
+        "symmetry_constraint_mask": [False],
+        "implied_constraint_mask": [False],
+        "optimization": False,
+    },
+    {
+        "name": "round_robin_distinct_symm",
+        "model": DistinctRoundRobinSolver,
+        "symmetry_constraint_mask": [True],
+        "implied_constraint_mask": [False],
+        "optimization": False,
+    },
+    {
+        "name": "round_robin_distinct_implied",
+        "model": DistinctRoundRobinSolver,
+        "symmetry_constraint_mask": [False],
+        "implied_constraint_mask": [True],
+        "optimization": False,
+    },
+    {
+        "name": "round_robin_distinct_full",
+        "model": DistinctRoundRobinSolver,
+        "symmetry_constraint_mask": [True],
+        "implied_constraint_mask": [True],
+        "optimization": False,
+    },
     {
         "name": "round_robin_bitvec",
         "model": BitVecRoundRobinSolver,
@@ -120,14 +150,116 @@ experiments = [
     },
 ]
 
-def solve(instance, timeout, cache={}, random_seed=42, models_filter=None, **kwargs):
+# The satisfiability models exported to SMT-LIB2 and solved by every external solver supporting their logic,
+# and by the portfolio racing all of them
+experiments += [
+    {
+        **experiment,
+        "name": f"{experiment['name']}_{solver}",
+        "solver": solver
+    }
+    for experiment in experiments if not experiment["optimization"]
+    for solver in [*SMTLIB_SOLVERS, "portfolio"] if (solver == "portfolio") or (experiment["model"].logic in SMTLIB_SOLVERS[solver]["logics"])
+]
+
+# Incremental variants: the experiments of a family share one core model, and the symmetry-breaking and
+# implied constraints of each variant are switched on by assumptions
+variants = {
+    "": (False, False),
+    "_symm": (True, False),
+    "_implied": (False, True),
+    "_full": (True, True),
+}
+experiments += [
+    {
+        "name": f"{model_name}{variant}{'_optim' if optimization else ''}_incremental",
+        "model": model,
+        "symmetry_constraint_mask": [symmetry],
+        "implied_constraint_mask": [implied],
+        "optimization": optimization,
+        "family": f"{model_name}{'_optim' if optimization else ''}_incremental",
+    }
+    for model_name, model, optimizations in [("naive", NaiveSolver, [False, True]), ("round_robin", RoundRobinSolver, [False]), ("round_robin_distinct", DistinctRoundRobinSolver, [False]), ("round_robin_bitvec", BitVecRoundRobinSolver, [False])]
+    for optimization in optimizations
+    for variant, (symmetry, implied) in variants.items()
+]
+
+# Naive model with pseudo-Boolean cardinality constraints, optionally over one-hot slot literals.
+# The pseudo-Boolean constraints are a Z3 extension of SMT-LIB2, so they are only solved by Z3.
+experiments += [
+    {
+        "name": f"naive_{encoding}{variant}{'_optim' if optimization else ''}",
+        "model": PseudoBooleanNaiveSolver,
+        "symmetry_constraint_mask": [symmetry],
+        "implied_constraint_mask": [implied],
+        "optimization": optimization,
+        "one_hot": encoding == "pb_onehot",
+    }
+    for encoding in ["pb", "pb_onehot"]
+    for optimization in [False, True]
+    for variant, (symmetry, implied) in variants.items()
+]
+
+# Z3 tactic pipelines, each applied to the satisfiability and optimization experiments of the models it fits
+presolve = ["simplify", "propagate-values", "solve-eqs"]
+experiments += [
+    {
+        **experiment,
+        "name": f"{experiment['name']}_{preset}",
+        "tactic": tactic
+    }
+    for preset, tactic, models in [
+        ("qflia", [*presolve, "qflia"], [NaiveSolver, PseudoBooleanNaiveSolver, RoundRobinSolver, DistinctRoundRobinSolver]),
+        ("card2bv", [*presolve, "card2bv", "qflia"], [PseudoBooleanNaiveSolver]),
+        ("qfbv", [*presolve, "qfbv"], [BitVecRoundRobinSolver]),
+    ]
+    for experiment in experiments
+    if (experiment["model"] in models) and ("solver" not in experiment) and ("family" not in experiment)
+]
+
+def list_models():
+    return [experiment["name"] for experiment in experiments]
+
+def model_family(name):
+    """Name of the group of models solved together with the given one (the model itself if solved alone)."""
+    for experiment in experiments:
+        if experiment["name"] == name:
+            return experiment.get("family", name)
+    return name
+
+def _solveExperiment(experiment, instance, timeout, random_seed, kwargs):
+    """Build and solve the model of an experiment, run in the child process of solveIsolated."""
+    return experiment["model"](instance,
+                               timeout=timeout,
+                               implied_constraints=any(experiment["implied_constraint_mask"]),
+                               symmetry_constraints=any(experiment["symmetry_constraint_mask"]),
+                               optimization=experiment["optimization"],
+                               engine=experiment.get("solver", "z3"),
+                               one_hot=experiment.get("one_hot", False),
+                               tactic=experiment.get("tactic"),
+                               params=experiment.get("params"),
+                               random_seed=random_seed,
+                               **kwargs).solve()
+
+def _solveFamily(family, instance, timeout, random_seed, kwargs):
+    """Build the core model of a family of experiments once and solve all of them incrementally."""
+    return family[0]["model"](instance,
+                              timeout=timeout,
+                              optimization=family[0]["optimization"],
+                              random_seed=random_seed,
+                              **kwargs).solve_variants({
+                                  experiment["name"]: (any(experiment["symmetry_constraint_mask"]), any(experiment["implied_constraint_mask"]))
+                                  for experiment in family
+                              })
+
+def solve(instance, timeout, cache={}, random_seed=42, models_filter=None, mem_limit=-1, **kwargs):
     results = {}
     
     for experiment in experiments:
         if (models_filter is not None) and (experiment["name"] not in models_filter):
             continue
         logger.info(f"Starting model {experiment['name']}")
-        name, model, symmetry_constraint_mask, implied_constraint_mask, optimization = experiment["name"], experiment["model"], experiment["symmetry_constraint_mask"], experiment["implied_constraint_mask"], experiment["optimization"]
+        name = experiment["name"]
 
         # Check if result is in cache00
         if name in cache:
@@ -146,11 +278,37 @@ def solve(instance, timeout, cache={}, random_seed=42, models_filter=None, **kwa
             continue
             
         
-        results[name] = model(instance,
-                              timeout=timeout,
-                              implied_constraint_mask=implied_constraint_mask,
-                              symmetry_constraint_mask=symmetry_constraint_mask,
-                              **kwargs).solve()
+        if name in results:
+            # Already solved with its family
+            continue
+
+        if "family" in experiment:
+            # Solve the pending experiments of the family in a single child process, each with its own timeout
+            family = [
+                member for member in experiments
+                if (member.get("family") == experiment["family"]) and (member["name"] not in cache)
+                and ((models_filter is None) or (member["name"] in models_filter))
+            ]
+            family_results = solveIsolated(_solveFamily, (family, instance, timeout, random_seed, kwargs), timeout * len(family), mem_limit)
+            crash_extras = family_results.pop("_extras")
+            for member in family:
+                if member["name"] in family_results:
+                    results[member["name"]] = family_results[member["name"]]
+                    results[member["name"]].setdefault("_extras", {}).setdefault("crash_reason", None)
+                else:
+                    # The child did not return, every experiment reports the failure
+                    results[member["name"]] = {
+                        "time": timeout,
+                        "optimal": False,
+                        "obj": None,
+                        "sol": None,
+                        "_extras": dict(crash_extras)
+                    }
+            gc.collect()
+            continue
+
+        # Build and solve the model in a child process, killed if it outlives the timeout
+        results[name] = solveIsolated(_solveExperiment, (experiment, instance, timeout, random_seed, kwargs), timeout, mem_limit)
 
         gc.collect()
 
@@ -2,22 +2,111 @@ from cp.solve import solve as cp_solve
 from sat.solve import solve as sat_solve
 from smt.solve import solve as smt_solve
 from milp.solve import solve as milp_solve
+from construct.solve import solve as construct_solve
+from cp.solve import list_models as cp_models
+from sat.solve import list_models as sat_models
+from smt.solve import list_models as smt_models
+from smt.solve import model_family as smt_model_family
+from milp.solve import list_models as milp_models
+from construct.solve import list_models as construct_models
+from results_store import ResultsJournal, writeJsonAtomic
+from process_utils import setMemoryLimit
+from check_solution_json import check_solution
+from timings import PhaseTimer, VALIDATION
+from benchmark import aggregateRuns
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 import argparse
 import os
 import json
-import platform
 import logging
 logger = logging.getLogger(__name__)
 
-#check if the platform is not Windows
-if platform.system() != "Windows":
-    import resource
+# Method name -> (results subdirectory, solve function, function listing the models of the method)
+METHODS = {
+    "cp": ("CP/", cp_solve, cp_models),
+    "sat": ("SAT/", sat_solve, sat_models),
+    "smt": ("SMT/", smt_solve, smt_models),
+    "milp": ("MILP/", milp_solve, milp_models),
+    "construct": ("CONSTRUCT/", construct_solve, construct_models),
+}
+
+# Number of times an experiment is submitted to a new worker pool after the previous one broke
+MAX_POOL_ATTEMPTS = 2
+
+# Method name -> function mapping a model to the family of models solved together in a single run
+MODEL_FAMILIES = {
+    "smt": smt_model_family,
+}
 
 def __loadCache(results_file_path):
     if not os.path.isfile(results_file_path): return {}
 
-    with open(results_file_path, "r") as f:
-        return json.load(f)
+    try:
+        with open(results_file_path, "r") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        # Left truncated by a previous version of the orchestrator, the results are rebuilt from the journal
+        logger.warning(f"Ignoring corrupted results file {results_file_path}")
+        return {}
+
+
+def _runExperiment(method, instance, models, timeout, random_seed, mem_limit=-1):
+    """Runs the (method, instance, model) experiments of a family of models through the solve function of the method.
+
+    Defined at module level so that it can be dispatched to the worker processes of the pool.
+    Returns the results of each model.
+    """
+    _, solve_fn, _ = METHODS[method]
+    results = solve_fn(
+        instance = instance,
+        timeout = timeout,
+        cache = {},
+        random_seed = random_seed,
+        models_filter = list(models),
+        mem_limit = mem_limit
+    )
+    results = {model: results.get(model) for model in models}
+
+    # Validate the solutions, timed as the last phase of the experiments
+    for model, result in results.items():
+        if (result is not None) and (result["sol"] is not None):
+            timer = PhaseTimer(VALIDATION)
+            try:
+                valid, errors = check_solution(result["sol"])
+            except Exception as e:
+                # A malformed solution (e.g. with missing teams) must not abort the other experiments
+                valid, errors = False, [f"The solution could not be checked: {e}"]
+            timer.end()
+            result.setdefault("_extras", {}).setdefault("timings", {}).update(timer.timings)
+            result["_extras"]["validation"] = {"valid": valid, "errors": errors}
+            if not valid:
+                logger.warning(f"Model {model} of {method} on instance {instance} returned an invalid solution: {errors}")
+    return method, instance, random_seed, results
+
+
+def _saveInstanceResults(results_file_path, instance_results, cached_results, args):
+    instance_results = { **instance_results }
+
+    # Adding missing cached results
+    if (not args.overwrite_old) and (args.models is None):
+        for key in cached_results:
+            if key not in instance_results:
+                instance_results[key] = cached_results[key]
+
+    # Remove extra fields for submission
+    if args.submit_mode:
+        for key in instance_results:
+            instance_results[key] = {
+                "time": instance_results[key]["time"],
+                "optimal": instance_results[key]["optimal"],
+                "obj": instance_results[key]["obj"],
+                "sol": instance_results[key]["sol"]
+            }
+
+    # Saving instance results
+    logger.info(f"Saving results in {results_file_path}")
+    writeJsonAtomic(results_file_path, instance_results)
 
 
 
@@ -30,11 +119,16 @@ if __name__ == "__main__":
     parser.add_argument("--models", type=lambda arg: arg.split(","), required=False, default=None, 
                         help="Name of the models to run, comma separated")
     parser.add_argument("--seed", type=int, required=False, default=42, help="Seed for random operations")
+    parser.add_argument("--seeds", type=int, required=False, default=1,
+                        help="Benchmark mode: number of seeds, from --seed on, to run each experiment with. "
+                             "The results then report the run with the median time and the statistics of all the runs")
     parser.add_argument("--mem-limit", type=int, required=False, default=-1, help="Memory usage limit in MB")
     parser.add_argument("--runner-label", type=str, required=False, default="", help="Name of the machine that is executing")
     parser.add_argument("--methods", type=lambda arg: arg.split(","), required=False, default=["cp", "sat", "smt", "milp"], 
                         help="Methods to run, comma separated")
     parser.add_argument("--submit-mode", action="store_true", help="If set, the output results will be in the format required for submission")
+    parser.add_argument("--jobs", type=int, required=False, default=1, 
+                        help="Number of experiments to run in parallel worker processes")
     args = parser.parse_args()
 
     logging.basicConfig(
@@ -45,19 +139,16 @@ if __name__ == "__main__":
 
     INSTANCES = [6,8,10,12,14,16,18,20]
 
-    # Set memory limit if needed
-    if args.mem_limit >= 0 and platform.system() != "Windows":
-        resource.setrlimit(resource.RLIMIT_AS, (args.mem_limit*1024*1024, args.mem_limit*1024*1024))
+    # Set memory limit if needed. With parallel jobs, the limit is applied to each worker instead.
+    if args.jobs <= 1:
+        setMemoryLimit(args.mem_limit)
 
     # Create output directories
     results_dir = args.output_path
-    cp_dir = os.path.join(results_dir, "CP/")
-    sat_dir = os.path.join(results_dir, "SAT/")
-    smt_dir = os.path.join(results_dir, "SMT/")
-    milp_dir = os.path.join(results_dir, "MILP/")
-
-    for dir in [results_dir, cp_dir, sat_dir, smt_dir, milp_dir]:
-        os.makedirs((dir), exist_ok=True)
+    os.makedirs(results_dir, exist_ok=True)
+    for method in METHODS:
+        if method in args.methods:
+            os.makedirs(os.path.join(results_dir, METHODS[method][0]), exist_ok=True)
 
 
     logger.info("-"*50)
@@ -65,58 +156,116 @@ if __name__ == "__main__":
     logger.info(f"Methods: {args.methods}")
     logger.info(f"Memory limit: {args.mem_limit} MB")
     logger.info(f"Timeout: {args.timeout} s")
+    logger.info(f"Parallel jobs: {args.jobs}")
+    logger.info(f"Seeds: {args.seeds}")
     logger.info("-"*50)
 
-    
-    experiments_setup = []
-    if "cp" in args.methods: experiments_setup.append((cp_dir, cp_solve))
-    if "sat" in args.methods: experiments_setup.append((sat_dir, sat_solve))
-    if "smt" in args.methods: experiments_setup.append((smt_dir, smt_solve))
-    if "milp" in args.methods: experiments_setup.append((milp_dir, milp_solve))
 
-    for out_dir, solve_fn in experiments_setup:
-        logger.info(f"Starting processing for {out_dir}")
+    # Every finished experiment is committed to the journal, the instance files are generated from it
+    journal = ResultsJournal(os.path.join(results_dir, ".journal.jsonl"))
 
+    # Collect the experiments to run, skipping the cached ones
+    methods = [method for method in METHODS if method in args.methods]
+    seeds = [args.seed + i for i in range(args.seeds)]
+    cached_results = {}
+    pending_results = {}
+    seed_results = {}
+    tasks = []
+    for method in methods:
+        out_dir, _, list_models_fn = METHODS[method]
         for instance in INSTANCES:
-            # Init cache
             if args.overwrite_old:
-                cached_results = {}
+                cache = {}
+                seed_caches = {seed: {} for seed in seeds}
             else:
-                cached_results = __loadCache(os.path.join(out_dir, f"{instance}.json"))
-
-            # Solving instance
-            logger.info(f"Starting instance {instance}")
-            instance_results = solve_fn(
-                instance = instance,
-                timeout = args.timeout,
-                cache = cached_results,
-                random_seed = args.seed,
-                models_filter = args.models
-            ) 
-            
-            # Adding missing cached results
-            if (not args.overwrite_old) and (args.models is None):
-                for key in cached_results:
-                    if key not in instance_results:
-                        instance_results[key] = cached_results[key]
+                cache = __loadCache(os.path.join(results_dir, out_dir, f"{instance}.json"))
+                seed_caches = {seed: journal.lookup(method, instance, seed, args.timeout) for seed in seeds}
+                if args.seeds <= 1:
+                    # A single run can also be reused from the instance file
+                    seed_caches[args.seed] = {**cache, **seed_caches[args.seed]}
+            cached_results[method, instance] = cache
+            pending_results[method, instance] = {}
+
+            # The models of a family are run together as a single task, once per seed
+            families = {seed: {} for seed in seeds}
+            for model in list_models_fn():
+                if (args.models is not None) and (model not in args.models):
+                    continue
+                seed_results[method, instance, model] = {}
+                for seed in seeds:
+                    if model in seed_caches[seed]:
+                        seed_results[method, instance, model][seed] = seed_caches[seed][model]
+                    else:
+                        families[seed].setdefault(MODEL_FAMILIES.get(method, lambda model: model)(model), []).append(model)
+                if len(seed_results[method, instance, model]) == len(seeds):
+                    logger.info(f"Cache hit for model {model} of {method} on instance {instance}")
+                if len(seed_results[method, instance, model]) > 0:
+                    pending_results[method, instance][model] = aggregateRuns(seed_results[method, instance, model], args.timeout)
+            tasks += [(method, instance, tuple(models), seed) for seed in seeds for models in families[seed].values()]
+
+    def saveInstance(method, instance):
+        out_dir, _, list_models_fn = METHODS[method]
+        instance_results = {
+            model: pending_results[method, instance][model]
+            for model in list_models_fn() if model in pending_results[method, instance]
+        }
+        _saveInstanceResults(
+            os.path.join(results_dir, out_dir, f"{instance}.json"), 
+            instance_results, 
+            cached_results[method, instance], 
+            args
+        )
+
+    def onExperimentDone(method, instance, seed, results):
+        for model, result in results.items():
+            if result is None: continue
 
             # Adding runner label
-            for key in instance_results:
-                if "_extras" not in instance_results[key]: instance_results[key]["_extras"] = {}
-                if "runner" not in instance_results[key]["_extras"]: instance_results[key]["_extras"]["runner"] = args.runner_label
-
-            # Remove extra fields for submission
-            if args.submit_mode:
-                for key in instance_results:
-                    instance_results[key] = {
-                        "time": instance_results[key]["time"],
-                        "optimal": instance_results[key]["optimal"],
-                        "obj": instance_results[key]["obj"],
-                        "sol": instance_results[key]["sol"]
-                    }
-
-            # Saving instance results
-            results_file_path = os.path.join(out_dir, f"{instance}.json")
-            with open(results_file_path, "w") as f:
-                logger.info(f"Saving results in {results_file_path}")
-                json.dump(instance_results, f, indent=3)
+            if "_extras" not in result: result["_extras"] = {}
+            if "runner" not in result["_extras"]: result["_extras"]["runner"] = args.runner_label
+
+            # Commit the experiment and aggregate it with the runs of the other seeds
+            journal.append(method, model, instance, seed, args.timeout, result)
+            seed_results[method, instance, model][seed] = result
+            pending_results[method, instance][model] = aggregateRuns(seed_results[method, instance, model], args.timeout)
+
+        # Refresh the instance file
+        saveInstance(method, instance)
+
+    # Refresh the instance files with the cached results
+    for method, instance in pending_results:
+        saveInstance(method, instance)
+
+    if args.jobs <= 1:
+        for method, instance, models, seed in tasks:
+            logger.info(f"Starting models {', '.join(models)} of {method} on instance {instance} with seed {seed}")
+            onExperimentDone(*_runExperiment(method, instance, models, args.timeout, seed, args.mem_limit))
+    else:
+        # A worker killed by the OS (e.g. out of memory) breaks the whole pool and fails all its unfinished experiments.
+        # These are run again in a new pool, at most MAX_POOL_ATTEMPTS times each since the culprit cannot be told apart.
+        attempts = {task: 0 for task in tasks}
+        while len(tasks) > 0:
+            unfinished = []
+            with ProcessPoolExecutor(max_workers=args.jobs, initializer=setMemoryLimit, initargs=(args.mem_limit,)) as pool:
+                futures = {
+                    pool.submit(_runExperiment, method, instance, models, args.timeout, seed, args.mem_limit): (method, instance, models, seed)
+                    for method, instance, models, seed in tasks
+                }
+                for future in as_completed(futures):
+                    method, instance, models, seed = futures[future]
+                    try:
+                        onExperimentDone(*future.result())
+                        logger.info(f"Finished models {', '.join(models)} of {method} on instance {instance} with seed {seed}")
+                    except BrokenProcessPool:
+                        attempts[futures[future]] += 1
+                        if attempts[futures[future]] < MAX_POOL_ATTEMPTS:
+                            unfinished.append(futures[future])
+                        else:
+                            logger.error(f"Models {', '.join(models)} of {method} on instance {instance} with seed {seed} failed: "
+                                         f"the worker pool broke in all the {MAX_POOL_ATTEMPTS} attempts, no result is recorded")
+                    except Exception as e:
+                        # The experiments raised: no result is recorded, they are run again by the next invocation
+                        logger.error(f"Models {', '.join(models)} of {method} on instance {instance} with seed {seed} failed: {e}")
+            if len(unfinished) > 0:
+                logger.error(f"The worker pool broke, restarting it for {len(unfinished)} unfinished experiments")
+            tasks = unfinished
@@ -0,0 +1,41 @@
+"""Phase timings of the experiments, reported under _extras.timings."""
+import time
+
+# Phases of an experiment, in execution order
+BUILD = "build"
+COMPILE = "compile"
+SOLVE = "solve"
+EXTRACTION = "extraction"
+VALIDATION = "validation"
+PHASES = [BUILD, COMPILE, SOLVE, EXTRACTION, VALIDATION]
+
+
+class PhaseTimer:
+    """Accumulates the duration in seconds of the phases of an experiment with a monotonic clock.
+
+    Beginning a phase ends the current one. A phase entered more than once (e.g. the solve calls of
+    an iterative optimizer) accumulates all of its durations.
+    """
+    def __init__(self, phase=None):
+        self.timings = {}
+        self.phase = None
+        self.phase_start = None
+        if phase is not None:
+            self.begin(phase)
+
+    def begin(self, phase):
+        """End the current phase, if any, and start phase."""
+        self.end()
+        self.phase = phase
+        self.phase_start = time.monotonic()
+
+    def end(self):
+        """End the current phase, if any, and return the timings so far."""
+        if self.phase is not None:
+            self.add(self.phase, time.monotonic() - self.phase_start)
+            self.phase = None
+        return self.timings
+
+    def add(self, phase, duration):
+        """Account duration seconds to phase, for phases measured elsewhere (e.g. by an external solver)."""
+        self.timings[phase] = self.timings.get(phase, 0.0) + duration
@@ -0,0 +1,28 @@
+"""Z3 solvers configured per experiment with a tactic pipeline, options and a random seed."""
+from z3 import Solver, Tactic, Then, set_param
+
+
+def makeSolver(tactic=None, params={}, random_seed=None):
+    """Builds a Z3 solver from the tactic and params fields of an experiment.
+
+    tactic is a list of tactic names chained with Then into a solver, or None for the default solver.
+    params maps Z3 options to their value. Module options (e.g. sat.cardinality.solver) are only
+    checked against the modules the solver actually runs, so they are set globally, which is safe as
+    every experiment runs in its own process. The other options are set on the solver.
+    random_seed, if given, seeds both the SMT and the SAT cores.
+    """
+    if tactic is None:
+        solver = Solver()
+    elif len(tactic) == 1:
+        solver = Tactic(tactic[0]).solver()
+    else:
+        solver = Then(*tactic).solver()
+
+    if random_seed is not None:
+        params = {**params, "smt.random_seed": random_seed, "sat.random_seed": random_seed}
+    for key, value in params.items():
+        if "." in key:
+            set_param(key, value)
+        else:
+            solver.set(key, value)
+    return solver
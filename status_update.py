@@ -14,6 +14,24 @@ def statusToOrdinal(status):
     if status == "inconsistent": return 5
 
 
+# Phases of _extras.timings, with the initial used in the timings tables
+TIMING_PHASES = [("build", "B"), ("compile", "C"), ("solve", "S"), ("extraction", "E"), ("validation", "V")]
+
+
+def displayedTime(status):
+    """Time of an experiment: the median across seeds in benchmark mode, the time of its single run otherwise."""
+    if "benchmark" in status:
+        return round(status["benchmark"]["median_time"], 2)
+    return status["time"]
+
+
+def rankingTime(status):
+    """Time used to rank the experiments: the PAR-2 score in benchmark mode, the time of the single run otherwise."""
+    if "benchmark" in status:
+        return status["benchmark"]["par2"]
+    return status["time"]
+
+
 def formatMethodStatusFileName(method):
     return f"{method.lower()}-status.md"
 
@@ -40,11 +58,11 @@ def generateOverallStatus(checks, to_display_methods, method_status_path):
                 } 
                 for test_name, status in checks[method][instance].items()
             ]
-            instance_tests = sorted(instance_tests, key=lambda x: (statusToOrdinal(x["status"]), x["obj"], x["time"]))
+            instance_tests = sorted(instance_tests, key=lambda x: (statusToOrdinal(x["status"]), x["obj"], rankingTime(x)))
             entry = ""
 
             best_instance_status = instance_tests[0]["status"]
-            best_instance_time = instance_tests[0]["time"]
+            best_instance_time = displayedTime(instance_tests[0])
             best_instance_obj = instance_tests[0]["obj"]
             best_instance_name = instance_tests[0]["name"].replace('_', '-')
 
@@ -92,7 +110,7 @@ def generateSpecificStatus(checks, method):
             entry = ""
             status = checks[method][instance][model]["status"]
             obj = checks[method][instance][model]["obj"]
-            time = checks[method][instance][model]["time"]
+            time = displayedTime(checks[method][instance][model])
 
 
             if status == "optimal":
@@ -111,6 +129,70 @@ def generateSpecificStatus(checks, method):
     return status_md
 
 
+def generateTimingsStatus(checks, method):
+    """Table of the time spent in each phase by the models that found a solution, if any reported timings."""
+    num_instances = len(checks[method])
+    instances = checks[method].keys()
+
+    # Models missing on some instances are still listed
+    models = list(dict.fromkeys(model for instance in instances for model in checks[method][instance]))
+    if not any(checks[method][instance][model].get("timings") for instance in instances for model in checks[method][instance]):
+        return ""
+
+    status_md = "\n## Timings\n"
+    status_md += f"Seconds spent in each phase: {', '.join([f'{initial} = {phase}' for phase, initial in TIMING_PHASES])}.\n\n"
+    status_md += f"| $\\text{{Model}}$ | {' | '.join([f'${i}$' for i in instances])} |\n"
+    status_md += f"|:-:| {''.join([':---:|']*num_instances)}\n"
+
+    for model in models:
+        status_md += "$\\text{"+ model.replace('_', '-') +"}$ | "
+        for instance in instances:
+            timings = checks[method][instance].get(model, {}).get("timings")
+            if timings:
+                entry = "</br>".join([f"{initial} {timings[phase]:.2f}" for phase, initial in TIMING_PHASES if phase in timings])
+            else:
+                entry = f"$-$"
+            status_md += f"{entry} | "
+        status_md += "\n"
+
+    return status_md
+
+
+def generateBenchmarkStatus(checks, method):
+    """Table of the statistics across seeds of every model, if any was run in benchmark mode."""
+    num_instances = len(checks[method])
+    instances = checks[method].keys()
+
+    # Models missing on some instances are still listed
+    models = list(dict.fromkeys(model for instance in instances for model in checks[method][instance]))
+    if not any("benchmark" in checks[method][instance][model] for instance in instances for model in checks[method][instance]):
+        return ""
+
+    status_md = "\n## Benchmark\n"
+    status_md += "Median time in seconds (interquartile range), success rate and PAR-2 score across seeds. "
+    status_md += "The result of each model is the one of its run with the lower median time, so its time can differ "
+    status_md += "from the median time with an even number of seeds.\n\n"
+    status_md += f"| $\\text{{Model}}$ | {' | '.join([f'${i}$' for i in instances])} |\n"
+    status_md += f"|:-:| {''.join([':---:|']*num_instances)}\n"
+
+    for model in models:
+        status_md += "$\\text{"+ model.replace('_', '-') +"}$ | "
+        for instance in instances:
+            benchmark = checks[method][instance].get(model, {}).get("benchmark")
+            if benchmark:
+                entry = (
+                    f"{benchmark['median_time']:.2f} ({benchmark['iqr_time']:.2f})"
+                    f"</br>{benchmark['success_rate']:.0%} of {len(benchmark['seeds'])}"
+                    f"</br>PAR-2 {benchmark['par2']:.2f}"
+                )
+            else:
+                entry = f"$-$"
+            status_md += f"{entry} | "
+        status_md += "\n"
+
+    return status_md
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(prog="Update README statuses")
     parser.add_argument("--checks-file", type=str, required=True)
@@ -123,8 +205,9 @@ if __name__ == "__main__":
     with open(args.checks_file, "r") as f: 
         checks = json.load(f)
 
+    to_display_methods = [m for m in to_display_methods if m in checks]
+
     for i in range(1, len(to_display_methods)):
-        assert to_display_methods[i] in checks
         assert len(checks[to_display_methods[i]]) == len(checks[to_display_methods[0]])
 
     os.makedirs((args.method_status_dir), exist_ok=True)
@@ -154,3 +237,5 @@ if __name__ == "__main__":
         with open(os.path.join(args.method_status_dir, formatMethodStatusFileName(method)), "w") as f: 
             f.write(f"# {method} status\n")
             f.write(generateSpecificStatus(checks, method))
+            f.write(generateTimingsStatus(checks, method))
+            f.write(generateBenchmarkStatus(checks, method))